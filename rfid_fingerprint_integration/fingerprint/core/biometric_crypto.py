@@ -5,14 +5,108 @@ Simple, robust biometric encryption using AS608 fingerprint sensor
 """
 
 import os
+import sys
 import time
 import hashlib
+import functools
+import threading
 import adafruit_fingerprint
 import serial
+from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+# as608_menu lives in the tests directory next to this package
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tests'))
+from as608_menu import enable_low_latency
+
+
+def template_to_bytes(template):
+    """
+    Normalize a template to one contiguous bytes object.
+    
+    Accepts bytes-like objects, the list[int] returned by get_fpdata, or a
+    sequence of bytes chunks (joined once), so the KDF hashes a single buffer
+    and the memoized derive_template_key gets a hashable key.
+    """
+    if isinstance(template, bytes):
+        return template
+    if isinstance(template, (list, tuple)) and template and not isinstance(template[0], int):
+        return b''.join(template)
+    return bytes(template)
+
+
+@functools.lru_cache(maxsize=32)
+def derive_template_key(template):
+    """
+    Derive the (salt, key) pair for a stored fingerprint template.
+    
+    Memoized on the template bytes, so every crypto instance in the
+    process shares one derivation per enrolled finger.
+    
+    Args:
+        template (bytes): Stored template from the sensor (see template_to_bytes)
+        
+    Returns:
+        tuple: (16-byte salt, 32-byte AES-256 key)
+    """
+    # Create salt from template hash
+    salt = hashlib.sha256(template).digest()[:16]
+    
+    # Derive 256-bit key using HKDF (template is already high-entropy)
+    kdf = HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=salt,
+        info=b'as608-aes256'
+    )
+    return salt, kdf.derive(template)
+
+
+def gcm_encrypt(aes, data):
+    """
+    Encrypt data with AES-GCM under a fresh random nonce.
+    
+    Args:
+        aes: algorithms.AES instance for the key
+        data (bytes): Plaintext
+        
+    Returns:
+        bytes: 12-byte nonce + ciphertext + 16-byte tag
+    """
+    nonce = os.urandom(12)
+    encryptor = Cipher(aes, modes.GCM(nonce)).encryptor()
+    # Write nonce, ciphertext and tag into one buffer instead of concatenating;
+    # the 16 tag bytes also cover update_into's block_size - 1 slack
+    out = bytearray(12 + len(data) + 16)
+    out[:12] = nonce
+    n = encryptor.update_into(data, memoryview(out)[12:])
+    encryptor.finalize()
+    out[12 + n:] = encryptor.tag
+    return bytes(out)
+
+
+def gcm_decrypt(aes, blob):
+    """
+    Decrypt a gcm_encrypt() blob. Raises ValueError if it is too short and
+    InvalidTag if it was modified or the key doesn't match.
+    
+    Returns:
+        memoryview: The plaintext, without copying it out of its buffer
+    """
+    if len(blob) < 12 + 16:
+        raise ValueError("Encrypted data is too short")
+    view = memoryview(blob)
+    nonce = view[:12].tobytes()
+    ciphertext = view[12:-16]
+    tag = view[-16:].tobytes()
+    
+    # finalize verifies the tag
+    decryptor = Cipher(aes, modes.GCM(nonce, tag)).decryptor()
+    plaintext = bytearray(len(ciphertext) + 15)
+    n = decryptor.update_into(ciphertext, plaintext)
+    decryptor.finalize()
+    return memoryview(plaintext)[:n]
 
 
 class BiometricCrypto:
@@ -23,36 +117,76 @@ class BiometricCrypto:
         self.baudrate = baudrate
         self.sensor = None
         self.stored_ids = []
+        self._stored_set = set()
+        self._ids_dirty = True  # re-read enrolled IDs from the sensor on next use
+        self._key_cache = {}  # finger_id -> (salt, key)
+        self._aes_cache = {}  # finger_id -> algorithms.AES
+        self._sensor_lock = threading.RLock()  # serializes UART commands
+        
+    def connect(self, prefetch=True):
+        """
+        Connect to fingerprint sensor.
         
-    def connect(self):
-        """Connect to fingerprint sensor."""
+        Args:
+            prefetch (bool): Derive keys for every enrolled ID in a background
+                thread so the first encrypt/decrypt doesn't wait on the UART
+        """
         try:
-            uart = serial.Serial(self.port, baudrate=self.baudrate, timeout=1)
-            self.sensor = adafruit_fingerprint.Adafruit_Fingerprint(uart)
+            # as608_menu.open_sensor may have left the sensor at 115200, which
+            # it remembers across power cycles, so fall back to probing that
+            for baudrate in dict.fromkeys((self.baudrate, 115200, 57600)):
+                uart = serial.Serial(self.port, baudrate=baudrate, timeout=1)
+                enable_low_latency(uart)
+                try:
+                    self.sensor = adafruit_fingerprint.Adafruit_Fingerprint(uart)
+                    self.baudrate = baudrate
+                    break
+                except RuntimeError:
+                    uart.close()
+            else:
+                raise RuntimeError("Failed to find sensor, check wiring!")
+            self.invalidate()
             
             # Test connection and get stored IDs
             self.stored_ids = self._get_stored_ids()
+            self._stored_set = set(self.stored_ids)
+            if prefetch and self.stored_ids:
+                threading.Thread(target=self._prefetch_keys, daemon=True).start()
             return True
             
         except Exception as e:
             print(f"Connection error: {e}")
             return False
     
+    def _prefetch_keys(self):
+        """Warm the key cache for all enrolled IDs (runs in a background thread)."""
+        for finger_id in list(self.stored_ids):
+            self._derive_key(finger_id)
+    
     def _get_stored_ids(self):
-        """Get list of enrolled fingerprint IDs."""
-        stored = []
-        if self.sensor.read_templates() == adafruit_fingerprint.OK:
-            for i in range(500):  # AS608 supports up to 500 templates
-                if self.sensor.templates[i]:
-                    stored.append(i)
-        return stored
+        """Get list of enrolled fingerprint IDs (cached until invalidate())."""
+        if not self._ids_dirty:
+            return self.stored_ids
+        with self._sensor_lock:
+            ok = self.sensor.read_templates() == adafruit_fingerprint.OK
+        if not ok:
+            return []
+        # read_templates() fills sensor.templates with the populated IDs
+        self.stored_ids = sorted(self.sensor.templates)
+        self._stored_set = set(self.stored_ids)
+        self._ids_dirty = False
+        return self.stored_ids
     
     def _get_template(self, finger_id):
         """Get stored template for given finger ID."""
         try:
-            if self.sensor.load_model(finger_id) == adafruit_fingerprint.OK:
-                if self.sensor.get_fpdata("char", 1) == adafruit_fingerprint.OK:
-                    return self.sensor.fpdata
+            # load_model and get_fpdata must not interleave with a scan
+            with self._sensor_lock:
+                if self.sensor.load_model(finger_id) == adafruit_fingerprint.OK:
+                    # get_fpdata returns the template as list[int]
+                    data = self.sensor.get_fpdata("char", 1)
+                    if data:
+                        return bytes(data)
             return None
         except:
             return None
@@ -62,25 +196,35 @@ class BiometricCrypto:
         try:
             print("👆 Place finger on sensor...")
             
-            # Wait for finger detection
-            while self.sensor.get_image() != adafruit_fingerprint.OK:
-                time.sleep(0.2)
+            # Wait for finger detection: poll every 50 ms at first, backing
+            # off to 200 ms while the sensor stays empty
+            delay = 0.05
+            while True:
+                with self._sensor_lock:
+                    if self.sensor.get_image() == adafruit_fingerprint.OK:
+                        break
+                time.sleep(delay)
+                delay = min(delay * 2, 0.2)
                 
             print("✅ Finger detected")
             
-            # Convert to template and search
-            if self.sensor.image_2_tz(1) != adafruit_fingerprint.OK:
-                print("❌ Template creation failed")
-                return None
-                
-            if self.sensor.finger_search() != adafruit_fingerprint.OK:
-                print("❌ No match found")
-                return None
-                
-            finger_id = self.sensor.finger_id
-            confidence = self.sensor.confidence
+            # Convert to template and search; hold the lock so a background
+            # load_model can't overwrite char buffer 1 in between
+            with self._sensor_lock:
+                if self.sensor.image_2_tz(1) != adafruit_fingerprint.OK:
+                    print("❌ Template creation failed")
+                    return None
+                    
+                if self.sensor.finger_search() != adafruit_fingerprint.OK:
+                    print("❌ No match found")
+                    return None
+                    
+                finger_id = self.sensor.finger_id
+                confidence = self.sensor.confidence
             
-            if finger_id in self.stored_ids:
+            if self._ids_dirty:
+                self._get_stored_ids()
+            if finger_id in self._stored_set:
                 print(f"✅ Authenticated! ID: {finger_id}, Confidence: {confidence}")
                 time.sleep(0.5)  # Sensor cooldown
                 return finger_id
@@ -94,30 +238,61 @@ class BiometricCrypto:
     
     def _derive_key(self, finger_id):
         """Derive encryption key from stored fingerprint template."""
+        cached = self._key_cache.get(finger_id)
+        if cached:
+            return cached[1]
+        
         try:
             # Get stored template (always consistent)
             template = self._get_template(finger_id)
             if not template:
                 return None
             
-            # Create salt from template hash
-            salt = hashlib.sha256(template).digest()[:16]
-            
-            # Derive 256-bit key using PBKDF2
-            kdf = PBKDF2HMAC(
-                algorithm=hashes.SHA256(),
-                length=32,
-                salt=salt,
-                iterations=100000,
-                backend=default_backend()
-            )
-            
-            return kdf.derive(template)
+            salt, key = derive_template_key(template)
+            self._key_cache[finger_id] = (salt, key)
+            return key
             
         except Exception as e:
             print(f"Key derivation error: {e}")
             return None
     
+    def get_salt(self, finger_id):
+        """
+        Get the template-derived salt for a finger ID.
+        
+        Args:
+            finger_id (int): Enrolled fingerprint ID
+            
+        Returns:
+            bytes: 16-byte salt, or None if the template can't be read
+        """
+        if finger_id not in self._key_cache and not self._derive_key(finger_id):
+            return None
+        return self._key_cache[finger_id][0]
+    
+    def _aes(self, finger_id, key):
+        """Reuse the AES algorithm object for a finger ID across calls."""
+        aes = self._aes_cache.get(finger_id)
+        if aes is None:
+            aes = self._aes_cache[finger_id] = algorithms.AES(key)
+        return aes
+    
+    def invalidate(self, finger_id=None):
+        """
+        Drop cached keys after a template is enrolled or deleted, and
+        re-read the enrolled ID list on next use.
+        
+        Args:
+            finger_id (int, optional): Only forget this ID, or everything if None
+        """
+        if finger_id is None:
+            self._key_cache.clear()
+            self._aes_cache.clear()
+        else:
+            self._key_cache.pop(finger_id, None)
+            self._aes_cache.pop(finger_id, None)
+        self._ids_dirty = True
+    
     def encrypt(self, message, finger_id=None):
         """
         Encrypt message using fingerprint authentication.
@@ -142,16 +317,11 @@ class BiometricCrypto:
                 print("❌ Key derivation failed")
                 return None
             
-            # Generate random nonce
-            nonce = os.urandom(16)
-            
-            # Encrypt using AES-CTR
-            cipher = Cipher(algorithms.AES(key), modes.CTR(nonce), backend=default_backend())
-            encryptor = cipher.encryptor()
-            ciphertext = encryptor.update(message.encode('utf-8')) + encryptor.finalize()
+            # Encrypt using AES-GCM under a fresh nonce
+            encrypted_data = gcm_encrypt(self._aes(finger_id, key), message.encode('utf-8'))
             
             print(f"✅ Encrypted with fingerprint ID {finger_id}")
-            return nonce + ciphertext
+            return encrypted_data
             
         except Exception as e:
             print(f"❌ Encryption error: {e}")
@@ -179,19 +349,14 @@ class BiometricCrypto:
                 print("❌ Key derivation failed")
                 return None
             
-            # Extract nonce and ciphertext
-            nonce = encrypted_data[:16]
-            ciphertext = encrypted_data[16:]
-            
-            # Decrypt using AES-CTR
-            cipher = Cipher(algorithms.AES(key), modes.CTR(nonce), backend=default_backend())
-            decryptor = cipher.decryptor()
-            plaintext = decryptor.update(ciphertext) + decryptor.finalize()
-            
-            message = plaintext.decode('utf-8')
+            # Decrypt using AES-GCM (verifies the tag)
+            message = str(gcm_decrypt(self._aes(finger_id, key), encrypted_data), 'utf-8')
             print("✅ Decrypted successfully")
             return message
             
+        except InvalidTag:
+            print("❌ Decryption error: data was modified or fingerprint doesn't match")
+            return None
         except Exception as e:
             print(f"❌ Decryption error: {e}")
             return None
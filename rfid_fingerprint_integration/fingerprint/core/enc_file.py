@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Encrypted message file (.enc) format, shared by the menus.
+
+Layout: a fixed little-endian header (magic, version, original message
+length, unix timestamp, ciphertext length) followed by the raw ciphertext.
+Older files written as hex-encoded JSON are still accepted when reading.
+"""
+
+import json
+import struct
+import time
+from datetime import datetime
+
+ENC_MAGIC = b'FPEN'
+ENC_VERSION = 1
+ENC_HEADER = struct.Struct('<4sHIQI')
+
+
+def write_enc_file(filename, encrypted_data, message_length):
+    """Write encrypted_data to filename as header + raw ciphertext."""
+    header = ENC_HEADER.pack(ENC_MAGIC, ENC_VERSION, message_length,
+                             int(time.time()), len(encrypted_data))
+    with open(filename, 'wb') as f:
+        f.write(header)
+        f.write(encrypted_data)
+
+
+def read_enc_file(filename):
+    """
+    Read an .enc file, accepting both the binary format and legacy JSON files.
+    Raises ValueError for a binary file with an unknown version or a short body.
+    """
+    with open(filename, 'rb') as f:
+        raw = f.read()
+
+    if raw[:4] == ENC_MAGIC:
+        if len(raw) < ENC_HEADER.size:
+            raise ValueError("Truncated .enc header")
+        _, version, orig_len, ts, ct_len = ENC_HEADER.unpack_from(raw, 0)
+        if version != ENC_VERSION:
+            raise ValueError(f"Unsupported .enc version {version}")
+        encrypted_data = raw[ENC_HEADER.size:ENC_HEADER.size + ct_len]
+        if len(encrypted_data) != ct_len:
+            raise ValueError("Truncated .enc ciphertext")
+        return {
+            'encrypted_data': encrypted_data,
+            'original_message_length': orig_len,
+            'timestamp': datetime.fromtimestamp(ts).isoformat(),
+            'version': version
+        }
+
+    file_data = json.loads(raw)
+    file_data['encrypted_data'] = bytes.fromhex(file_data['encrypted_data'])
+    return file_data
@@ -10,34 +10,55 @@ import os
 # Add the tests directory to Python path to import as608_menu
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tests'))
 
-from as608_menu import open_sensor, list_ids, get_template
+from as608_menu import open_sensor, list_ids, get_template, POLL_INTERVAL, POLL_MAX_INTERVAL
+if __package__:
+    from .biometric_crypto import derive_template_key, template_to_bytes, gcm_encrypt, gcm_decrypt
+else:  # loaded as a top-level module by the scripts in fingerprint/tests
+    from biometric_crypto import derive_template_key, template_to_bytes, gcm_encrypt, gcm_decrypt
 import adafruit_fingerprint
-import hashlib
+import threading
 import time
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.backends import default_backend
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers import algorithms
 
 
 class FinalFingerprintCrypto:
-    def __init__(self):
+    def __init__(self, cache_plaintext=False):
         self.finger = None
         self.stored_ids = []
+        self._key_cache = {}  # finger_id -> (salt, key)
+        self._aes_cache = {}  # key -> algorithms.AES
+        # Opt-in: repeated decrypts of the same blob skip the scan entirely
+        self.cache_plaintext = cache_plaintext
+        self._plain_cache = {}  # encrypted blob -> plaintext
+        self._sensor_lock = threading.RLock()  # serializes UART commands
         
-    def connect_sensor(self):
-        """Connect to the fingerprint sensor."""
+    def connect_sensor(self, prefetch=True):
+        """
+        Connect to the fingerprint sensor.
+        With prefetch, keys for all stored IDs are derived in a background
+        thread so the first encrypt/decrypt doesn't wait on template reads.
+        """
         try:
             self.finger = open_sensor()
+            self.invalidate()
             if self.finger:
-                self.stored_ids = list_ids(self.finger)
+                with self._sensor_lock:
+                    self.stored_ids = list_ids(self.finger)
                 print(f"✅ Connected to sensor. Stored IDs: {self.stored_ids}")
+                if prefetch and self.stored_ids:
+                    threading.Thread(target=self._prefetch_keys, daemon=True).start()
                 return True
             return False
         except Exception as e:
             print(f"❌ Sensor connection failed: {e}")
             return False
     
+    def _prefetch_keys(self):
+        """Warm the template and key caches for every stored ID."""
+        for finger_id in list(self.stored_ids):
+            self.get_fingerprint_key(finger_id)
+    
     def simple_finger_detect(self):
         """
         Simple finger detection that just waits for ANY finger.
@@ -46,9 +67,14 @@ class FinalFingerprintCrypto:
         try:
             print("👆 Place your finger on the sensor...")
             
-            # Wait for finger
-            while self.finger.get_image() != adafruit_fingerprint.OK:
-                time.sleep(0.2)
+            # Wait for finger, polling fast at first and backing off
+            delay = POLL_INTERVAL
+            while True:
+                with self._sensor_lock:
+                    if self.finger.get_image() == adafruit_fingerprint.OK:
+                        break
+                time.sleep(delay)
+                delay = min(delay * 2, POLL_MAX_INTERVAL)
                 
             print("✅ Finger detected")
             return True
@@ -72,12 +98,16 @@ class FinalFingerprintCrypto:
             for attempt in range(max_attempts):
                 try:
                     # Wait for finger detection
-                    start_time = time.time()
-                    while time.time() - start_time < 10:  # 10 second timeout per attempt
-                        if self.finger.get_image() == adafruit_fingerprint.OK:
+                    deadline = time.monotonic() + 10  # 10 second timeout per attempt
+                    delay = POLL_INTERVAL
+                    while time.monotonic() < deadline:
+                        with self._sensor_lock:
+                            detected = self.finger.get_image() == adafruit_fingerprint.OK
+                        if detected:
                             print("✅ Finger detected")
                             break
-                        time.sleep(0.1)
+                        time.sleep(delay)
+                        delay = min(delay * 2, POLL_MAX_INTERVAL)
                     else:
                         if attempt < max_attempts - 1:
                             print(f"⏱️ Timeout on attempt {attempt + 1}, trying again...")
@@ -86,8 +116,16 @@ class FinalFingerprintCrypto:
                             print("❌ Timeout waiting for finger")
                             return None
                     
-                    # Convert image to template
-                    if self.finger.image_2_tz(1) != adafruit_fingerprint.OK:
+                    # Convert image to template and search while holding the lock,
+                    # so a background load_model can't clobber char buffer 1
+                    with self._sensor_lock:
+                        converted = self.finger.image_2_tz(1) == adafruit_fingerprint.OK
+                        if converted:
+                            search_result = self.finger.finger_search()
+                            finger_id = self.finger.finger_id
+                            confidence = self.finger.confidence
+                    
+                    if not converted:
                         if attempt < max_attempts - 1:
                             print(f"❌ Template conversion failed on attempt {attempt + 1}, retrying...")
                             continue
@@ -95,13 +133,7 @@ class FinalFingerprintCrypto:
                             print("❌ Failed to create template from finger")
                             return None
                     
-                    # Search for match
-                    search_result = self.finger.finger_search()
-                    
                     if search_result == adafruit_fingerprint.OK:
-                        finger_id = self.finger.finger_id
-                        confidence = self.finger.confidence
-                        
                         # Check if confidence is acceptable (lower threshold for compatibility)
                         if confidence >= 30:  # Lower threshold
                             if finger_id in self.stored_ids:
@@ -148,37 +180,98 @@ class FinalFingerprintCrypto:
             
         return finger_id
     
-    def get_fingerprint_key(self, finger_id):
+    def get_fingerprint_key(self, finger_id, template_bytes=None):
         """
         Generate encryption key from stored fingerprint template.
         Always uses the stored template for consistency.
+        Keys are cached per finger ID; call invalidate() after enroll/delete.
+        Pass template_bytes (the stored template for finger_id) to skip the
+        load_model + get_fpdata round trip to the sensor.
         """
+        cached = self._key_cache.get(finger_id)
+        if cached:
+            return cached[1]
+        
         try:
-            # Get the stored template (always consistent)
-            template = get_template(self.finger, finger_id)
+            # Get the stored template (always consistent); only hit the
+            # sensor when the caller didn't already hand us the bytes
+            if template_bytes:
+                template = template_to_bytes(template_bytes)
+            else:
+                with self._sensor_lock:
+                    template = get_template(self.finger, finger_id)
             if not template:
                 print(f"❌ Could not retrieve stored template for ID {finger_id}")
                 return None
             
-            # Create salt from template
-            salt = hashlib.sha256(template).digest()[:16]  # 16-byte salt
-            
-            # Derive key using PBKDF2
-            kdf = PBKDF2HMAC(
-                algorithm=hashes.SHA256(),
-                length=32,  # 32 bytes = 256 bits for AES-256
-                salt=salt,
-                iterations=100000,
-                backend=default_backend()
-            )
-            
-            key = kdf.derive(template)
+            # Shared, memoized HKDF derivation (see biometric_crypto)
+            salt, key = derive_template_key(template)
+            self._key_cache[finger_id] = (salt, key)
             return key
             
         except Exception as e:
             print(f"❌ Key derivation error: {e}")
             return None
     
+    def get_fingerprint_salt(self, finger_id):
+        """
+        Return the salt cached alongside the key for finger_id,
+        deriving (and caching) both on first use.
+        """
+        if finger_id not in self._key_cache and not self.get_fingerprint_key(finger_id):
+            return None
+        return self._key_cache[finger_id][0]
+    
+    def _aes(self, key):
+        """Reuse the AES algorithm object for a derived key across calls."""
+        aes = self._aes_cache.get(key)
+        if aes is None:
+            aes = self._aes_cache[key] = algorithms.AES(key)
+        return aes
+    
+    def invalidate(self, finger_id=None):
+        """
+        Forget cached keys after a fingerprint is enrolled or deleted.
+        Clears every entry when finger_id is None.
+        """
+        if finger_id is None:
+            self._key_cache.clear()
+            self._aes_cache.clear()
+        else:
+            cached = self._key_cache.pop(finger_id, None)
+            if cached:
+                self._aes_cache.pop(cached[1], None)
+        self.clear_plain_cache()
+    
+    def clear_plain_cache(self):
+        """Drop all memoized plaintexts."""
+        self._plain_cache.clear()
+    
+    def capture_key(self):
+        """
+        Authenticate once and return the derived key, for encrypting or
+        decrypting a batch of messages with encrypt_with_key/decrypt_with_key.
+        """
+        finger_id = self.authenticate_fingerprint()
+        if not finger_id:
+            print("❌ Authentication failed - no key")
+            return None
+        return self.get_fingerprint_key(finger_id)
+    
+    def encrypt_with_key(self, key, message):
+        """
+        Encrypt a message with an already-derived key (no sensor access).
+        Each call uses a fresh random nonce. Raises on failure.
+        """
+        return gcm_encrypt(self._aes(key), message.encode('utf-8'))
+    
+    def decrypt_with_key(self, key, encrypted_data):
+        """
+        Decrypt data with an already-derived key (no sensor access).
+        Raises InvalidTag if the data was modified or the key doesn't match.
+        """
+        return str(gcm_decrypt(self._aes(key), encrypted_data), 'utf-8')
+    
     def encrypt_message(self, message, finger_id=None):
         """Encrypt a message using fingerprint-derived key."""
         try:
@@ -195,16 +288,38 @@ class FinalFingerprintCrypto:
                 print("❌ Failed to derive encryption key")
                 return None
                 
-            # Generate random nonce
-            nonce = os.urandom(16)
-            
-            # Encrypt
-            cipher = Cipher(algorithms.AES(key), modes.CTR(nonce), backend=default_backend())
-            encryptor = cipher.encryptor()
-            ciphertext = encryptor.update(message.encode('utf-8')) + encryptor.finalize()
+            encrypted = self.encrypt_with_key(key, message)
             
             print(f"✅ Message encrypted with fingerprint ID {finger_id}")
-            return nonce + ciphertext
+            return encrypted
+            
+        except Exception as e:
+            print(f"❌ Encryption error: {e}")
+            return None
+    
+    def encrypt_bulk(self, messages, finger_id=None):
+        """
+        Encrypt several messages with one authentication and one key setup.
+        Each message still gets its own nonce. Returns a list of encrypted
+        blobs in the same order, or None if authentication or encryption fails.
+        """
+        try:
+            if finger_id is None:
+                finger_id = self.authenticate_fingerprint()
+                if not finger_id:
+                    print("❌ Authentication failed - cannot encrypt")
+                    return None
+            
+            key = self.get_fingerprint_key(finger_id)
+            if not key:
+                print("❌ Failed to derive encryption key")
+                return None
+            
+            encrypt = self.encrypt_with_key
+            encrypted = [encrypt(key, message) for message in messages]
+            
+            print(f"✅ {len(encrypted)} messages encrypted with fingerprint ID {finger_id}")
+            return encrypted
             
         except Exception as e:
             print(f"❌ Encryption error: {e}")
@@ -212,6 +327,12 @@ class FinalFingerprintCrypto:
     
     def decrypt_message(self, encrypted_data):
         """Decrypt a message using fingerprint authentication."""
+        if self.cache_plaintext:
+            cached = self._plain_cache.get(bytes(encrypted_data))
+            if cached is not None:
+                print("✅ Message decrypted (cached)")
+                return cached
+        
         try:
             # Authenticate
             finger_id = self.authenticate_fingerprint()
@@ -225,19 +346,15 @@ class FinalFingerprintCrypto:
                 print("❌ Failed to derive decryption key")
                 return None
             
-            # Extract nonce and ciphertext
-            nonce = encrypted_data[:16]
-            ciphertext = encrypted_data[16:]
-            
-            # Decrypt
-            cipher = Cipher(algorithms.AES(key), modes.CTR(nonce), backend=default_backend())
-            decryptor = cipher.decryptor()
-            plaintext = decryptor.update(ciphertext) + decryptor.finalize()
-            
-            message = plaintext.decode('utf-8')
+            message = self.decrypt_with_key(key, encrypted_data)
+            if self.cache_plaintext:
+                self._plain_cache[bytes(encrypted_data)] = message
             print(f"✅ Message decrypted successfully")
             return message
             
+        except InvalidTag:
+            print("❌ Decryption error: data was modified or fingerprint doesn't match")
+            return None
         except Exception as e:
             print(f"❌ Decryption error: {e}")
             return None
@@ -245,7 +362,7 @@ class FinalFingerprintCrypto:
 
 def main():
     """Test the final fingerprint crypto system."""
-    crypto = FinalFingerprintCrypto()
+    crypto = FinalFingerprintCrypto(cache_plaintext=True)
     
     if not crypto.connect_sensor():
         print("❌ Failed to connect to fingerprint sensor")
@@ -1,16 +1,95 @@
 # as608_utils.py
+import os
+import sys
 import time
+import bisect
+import functools
 import serial
 import adafruit_fingerprint
 
+try:
+    import RPi.GPIO as GPIO  # only needed for the optional touch-sense pin
+except ImportError:
+    GPIO = None
+
 # Open UART once and create the finger object
 # Adjust port if needed (e.g. "/dev/ttyS0", "/dev/ttyAMA0")
 UART_PORT = "/dev/serial0"
 BAUDRATE = 57600
+# open_sensor() switches the sensor to this rate (SetSysPara 4, N = baud / 9600).
+# The AS608 keeps the setting across power cycles, so opening probes it first.
+FAST_BAUDRATE = 115200
+
+# get_image() polling: start fast so a press is picked up within ~50 ms,
+# then back off to 200 ms while nothing is on the sensor. Reset per wait.
+POLL_INTERVAL = 0.05
+POLL_MAX_INTERVAL = 0.2
+
+# Stored templates only change on enroll/delete, so keep them in-process
+# instead of re-reading ~512 bytes over UART for every crypto operation.
+# Keyed by (id(finger), location_id).
+_TEMPLATE_CACHE = {}
+
+# match_finger() errors worth another attempt in quick_match(); anything else is fatal
+_RETRYABLE = ('Timeout', 'not found')
+
+# bytes.translate() table mapping non-printable bytes to '.' for hex dumps
+_ASCII_TBL = bytes(c if 32 <= c <= 126 else 0x2E for c in range(256))
 
-def open_sensor(port=UART_PORT, baudrate=BAUDRATE, timeout=1):
+def enable_low_latency(uart):
+    """
+    Ask the tty driver for ASYNC_LOW_LATENCY so reads return as soon as the
+    sensor's reply arrives instead of on the driver's ~16 ms flush tick.
+    Silently ignored where unsupported (non-Linux, or drivers without TIOCSSERIAL).
+    """
+    try:
+        uart.set_low_latency_mode(True)
+    except (AttributeError, NotImplementedError, ValueError, OSError):
+        pass
+
+def _try_connect(port, baudrate, timeout):
+    """Return a finger object talking at `baudrate`, or None if the sensor doesn't answer."""
     uart = serial.Serial(port, baudrate=baudrate, timeout=timeout)
-    finger = adafruit_fingerprint.Adafruit_Fingerprint(uart)
+    enable_low_latency(uart)
+    try:
+        return adafruit_fingerprint.Adafruit_Fingerprint(uart)
+    except RuntimeError:
+        uart.close()
+        return None
+
+def open_sensor(port=UART_PORT, baudrate=BAUDRATE, timeout=1, fast_baudrate=FAST_BAUDRATE,
+                touch_pin=None):
+    """
+    Open the sensor, moving it to `fast_baudrate` (pass None to stay at `baudrate`).
+    Keep `timeout` generous: finger_search/image_2_tz can take hundreds of ms to reply.
+    `touch_pin` is the BCM GPIO wired to the sensor's TOUCH output (high while a
+    finger is on the glass); when given, enroll_id waits for the finger to be
+    lifted on that pin instead of polling get_image().
+    """
+    finger = _try_connect(port, fast_baudrate, timeout) if fast_baudrate else None
+    if finger is None:
+        finger = _try_connect(port, baudrate, timeout)
+        if finger is None:
+            raise RuntimeError("Failed to find sensor, check wiring!")
+        if fast_baudrate and fast_baudrate != baudrate:
+            try:
+                # Sensor ACKs at the old rate, then switches
+                finger.set_sysparam(4, fast_baudrate // 9600)
+                finger._uart.baudrate = fast_baudrate
+                finger._uart.reset_input_buffer()
+            except RuntimeError:
+                pass  # sensor refused; keep talking at `baudrate`
+    # list_ids() cache; kept in sync by enroll_id/delete_id
+    finger._cached_ids = []
+    finger._ids_dirty = True
+    finger._touch_pin = None
+    if touch_pin is not None:
+        if GPIO is None:
+            print("⚠️ RPi.GPIO not available, ignoring touch_pin")
+        else:
+            GPIO.setmode(GPIO.BCM)
+            GPIO.setup(touch_pin, GPIO.IN)
+            finger._touch_pin = touch_pin
     return finger
 
 # ---------- Helpers ----------
@@ -18,15 +97,48 @@ def _ok_or_raise(code, msg="Command failed"):
     if code != adafruit_fingerprint.OK:
         raise RuntimeError(f"{msg} (code={hex(code)})")
 
+def invalidate_template_cache(finger, location_id=None):
+    """
+    Forget cached template bytes for `finger` (one ID, or all if location_id is None).
+    """
+    if location_id is not None:
+        _TEMPLATE_CACHE.pop((id(finger), location_id), None)
+        return
+    for key in [k for k in _TEMPLATE_CACHE if k[0] == id(finger)]:
+        del _TEMPLATE_CACHE[key]
+
+def _wait_for(finger, present, deadline):
+    """
+    Poll get_image() until a finger is on the sensor (present=True) or has
+    been lifted (present=False), or time.monotonic() passes `deadline`.
+    Sleeps between polls start at POLL_INTERVAL and back off to POLL_MAX_INTERVAL.
+    Returns the last get_image() code (OK/NOFINGER, or an error code while
+    waiting for a finger), or None on timeout.
+    """
+    delay = POLL_INTERVAL
+    while True:
+        r = finger.get_image()
+        if (r != adafruit_fingerprint.NOFINGER) if present else (r == adafruit_fingerprint.NOFINGER):
+            return r
+        if time.monotonic() > deadline:
+            return None
+        time.sleep(delay)
+        delay = min(delay * 2, POLL_MAX_INTERVAL)
+
 # ---------- List stored template IDs ----------
 def list_ids(finger):
     """
     Returns a sorted list of stored template IDs on the sensor.
+    Only the first call (or one after the cache is marked dirty) talks to the sensor.
     """
+    if not getattr(finger, '_ids_dirty', True):
+        return list(finger._cached_ids)
     rc = finger.read_templates()   # populates finger.templates
     _ok_or_raise(rc, "Failed to read templates")
     # finger.templates is a list of ints (IDs)
-    return sorted(finger.templates)
+    finger._cached_ids = sorted(finger.templates)
+    finger._ids_dirty = False
+    return list(finger._cached_ids)
 
 # ---------- Enroll a fingerprint to a specific ID ----------
 def enroll_id(finger, location_id, slot=1, timeout=30):
@@ -34,50 +146,39 @@ def enroll_id(finger, location_id, slot=1, timeout=30):
     Enroll a finger into `location_id` on the sensor.
     Returns True on success. Raises RuntimeError on failure.
     """
-    start = time.time()
     print(f"Enrolling into ID {location_id}. Place finger...")
 
     # 1) capture first image
-    while True:
-        if time.time() - start > timeout:
-            raise RuntimeError("Timeout waiting for first finger image")
-        r = finger.get_image()
-        if r == adafruit_fingerprint.OK:
-            print("Image 1 captured")
-            break
-        elif r == adafruit_fingerprint.NOFINGER:
-            time.sleep(0.2)
-            continue
-        else:
-            raise RuntimeError(f"get_image() failed: {hex(r)}")
+    r = _wait_for(finger, True, time.monotonic() + timeout)
+    if r is None:
+        raise RuntimeError("Timeout waiting for first finger image")
+    if r != adafruit_fingerprint.OK:
+        raise RuntimeError(f"get_image() failed: {hex(r)}")
+    print("Image 1 captured")
 
     # convert to char file 1
     r = finger.image_2_tz(slot)
     _ok_or_raise(r, "image_2_tz (first) failed")
 
     print("Remove finger...")
-    # wait for finger removal
-    while True:
-        r = finger.get_image()
-        if r == adafruit_fingerprint.NOFINGER:
-            break
-        time.sleep(0.2)
+    # wait for finger removal: TOUCH pin falling edge if wired, else poll
+    pin = getattr(finger, '_touch_pin', None)
+    if pin is not None:
+        lifted = (GPIO.input(pin) == GPIO.LOW or
+                  GPIO.wait_for_edge(pin, GPIO.FALLING, timeout=int(timeout * 1000)) is not None)
+    else:
+        lifted = _wait_for(finger, False, time.monotonic() + timeout) is not None
+    if not lifted:
+        raise RuntimeError("Timeout waiting for finger removal")
 
     print("Place same finger again...")
-    start2 = time.time()
     # capture second image
-    while True:
-        if time.time() - start2 > timeout:
-            raise RuntimeError("Timeout waiting for second finger image")
-        r = finger.get_image()
-        if r == adafruit_fingerprint.OK:
-            print("Image 2 captured")
-            break
-        elif r == adafruit_fingerprint.NOFINGER:
-            time.sleep(0.2)
-            continue
-        else:
-            raise RuntimeError(f"get_image() (2) failed: {hex(r)}")
+    r = _wait_for(finger, True, time.monotonic() + timeout)
+    if r is None:
+        raise RuntimeError("Timeout waiting for second finger image")
+    if r != adafruit_fingerprint.OK:
+        raise RuntimeError(f"get_image() (2) failed: {hex(r)}")
+    print("Image 2 captured")
 
     # convert to char file 2 (use the other slot: if slot=1 use 2 for second; but lib uses slot argument)
     second_slot = 2 if slot == 1 else 1
@@ -92,6 +193,9 @@ def enroll_id(finger, location_id, slot=1, timeout=30):
     # store model at location_id
     r = finger.store_model(location_id, slot=1)
     _ok_or_raise(r, f"store_model failed for ID {location_id}")
+    invalidate_template_cache(finger, location_id)
+    if not getattr(finger, '_ids_dirty', True) and location_id not in finger._cached_ids:
+        bisect.insort(finger._cached_ids, location_id)
     print(f"Stored model at ID {location_id}")
     return True
 
@@ -102,11 +206,14 @@ def delete_id(finger, location_id):
     """
     r = finger.delete_model(location_id)
     _ok_or_raise(r, f"delete_model failed for ID {location_id}")
+    invalidate_template_cache(finger, location_id)
+    if location_id in getattr(finger, '_cached_ids', ()):
+        finger._cached_ids.remove(location_id)
     print(f"Deleted template ID {location_id}")
     return True
 
 # ---------- Match/Identify a fingerprint ----------
-def match_finger(finger, timeout=30, slot=1, verbose=True):
+def match_finger(finger, timeout=30, slot=1, verbose=True, ids=None):
     """
     Match a fingerprint against all stored templates on the sensor.
     
@@ -115,6 +222,7 @@ def match_finger(finger, timeout=30, slot=1, verbose=True):
         timeout: Maximum time to wait for finger placement (seconds)
         slot: Char buffer slot to use (1 or 2)
         verbose: Whether to print detailed status messages
+        ids: Already-known stored IDs (e.g. from list_ids); skips re-enumerating
     
     Returns:
         dict: {
@@ -124,36 +232,42 @@ def match_finger(finger, timeout=30, slot=1, verbose=True):
             'error': str or None       # Error message if failed
         }
     """
-    if verbose:
-        print(f"Place finger on sensor for identification...")
+    # Nothing to match against: skip the capture/convert/search round trips
+    enrolled = ids
+    if enrolled is None:
+        try:
+            enrolled = list_ids(finger)
+        except RuntimeError:
+            enrolled = None  # can't tell; let finger_search decide
+    if enrolled == []:
+        return {
+            'success': False,
+            'id': None,
+            'confidence': None,
+            'error': 'No templates enrolled'
+        }
     
-    start_time = time.time()
+    if verbose:
+        print("Place finger on sensor for identification...")
     
     # Step 1: Capture finger image
-    while True:
-        if time.time() - start_time > timeout:
-            return {
-                'success': False,
-                'id': None,
-                'confidence': None,
-                'error': f'Timeout after {timeout} seconds waiting for finger'
-            }
-        
-        r = finger.get_image()
-        if r == adafruit_fingerprint.OK:
-            if verbose:
-                print("✅ Finger image captured")
-            break
-        elif r == adafruit_fingerprint.NOFINGER:
-            time.sleep(0.1)
-            continue
-        else:
-            return {
-                'success': False,
-                'id': None,
-                'confidence': None,
-                'error': f'Failed to capture image: {hex(r)}'
-            }
+    r = _wait_for(finger, True, time.monotonic() + timeout)
+    if r is None:
+        return {
+            'success': False,
+            'id': None,
+            'confidence': None,
+            'error': f'Timeout after {timeout} seconds waiting for finger'
+        }
+    if r != adafruit_fingerprint.OK:
+        return {
+            'success': False,
+            'id': None,
+            'confidence': None,
+            'error': f'Failed to capture image: {hex(r)}'
+        }
+    if verbose:
+        print("✅ Finger image captured")
     
     # Step 2: Convert image to template
     r = finger.image_2_tz(slot)
@@ -177,7 +291,7 @@ def match_finger(finger, timeout=30, slot=1, verbose=True):
         confidence = finger.confidence
         
         if verbose:
-            print(f"✅ Match found!")
+            print("✅ Match found!")
             print(f"   ID: {matched_id}")
             print(f"   Confidence: {confidence}/255 ({confidence/255*100:.1f}%)")
         
@@ -210,7 +324,7 @@ def match_finger(finger, timeout=30, slot=1, verbose=True):
         }
 
 # ---------- Quick match with retry ----------
-def quick_match(finger, max_attempts=3, timeout_per_attempt=10, min_confidence=50):
+def quick_match(finger, max_attempts=3, timeout_per_attempt=10, min_confidence=50, ids=None):
     """
     Attempt to match a fingerprint with retry logic and confidence filtering.
     
@@ -219,6 +333,7 @@ def quick_match(finger, max_attempts=3, timeout_per_attempt=10, min_confidence=5
         max_attempts: Maximum number of attempts
         timeout_per_attempt: Timeout for each attempt (seconds)
         min_confidence: Minimum confidence score to accept (0-255)
+        ids: Already-known stored IDs, passed through to match_finger()
     
     Returns:
         dict: Same as match_finger() but with attempt information
@@ -226,31 +341,36 @@ def quick_match(finger, max_attempts=3, timeout_per_attempt=10, min_confidence=5
     print(f"Quick match: Up to {max_attempts} attempts, min confidence {min_confidence}/255")
     
     for attempt in range(1, max_attempts + 1):
-        print(f"\n--- Attempt {attempt}/{max_attempts} ---")
+        print(f"\n--- Attempt {attempt}/{max_attempts}: place finger on sensor ---")
         
-        result = match_finger(finger, timeout=timeout_per_attempt, verbose=True)
+        # Only the final attempt narrates each step; earlier ones just report the outcome below
+        result = match_finger(finger, timeout=timeout_per_attempt,
+                              verbose=(attempt == max_attempts), ids=ids)
         
         if result['success']:
             if result['confidence'] >= min_confidence:
-                print(f"✅ High-confidence match accepted!")
+                print("✅ High-confidence match accepted!")
                 result['attempts'] = attempt
                 return result
             else:
                 print(f"⚠️ Low confidence ({result['confidence']}/255), trying again...")
                 continue
         else:
-            if "Timeout" in result['error']:
-                print(f"⏱️ Attempt {attempt} timed out, trying again...")
-                continue
-            elif "not found" in result['error']:
-                print(f"❌ Finger not recognized on attempt {attempt}")
-                # For "not found", we might want to try again in case of poor placement
-                continue
-            else:
+            error = result['error']
+            if not any(tag in error for tag in _RETRYABLE):
                 # Other errors are probably not retry-worthy
-                print(f"❌ Error on attempt {attempt}: {result['error']}")
+                print(f"❌ Error on attempt {attempt}: {error}")
                 result['attempts'] = attempt
                 return result
+            if "Timeout" in error:
+                print(f"⏱️ Attempt {attempt} timed out, trying again...")
+                continue
+            print(f"❌ Finger not recognized on attempt {attempt}")
+            # For "not found", try again in case of poor placement, but give the
+            # user time to reposition instead of re-scanning the same touch
+            if attempt < max_attempts:
+                time.sleep(0.1 * (2 ** (attempt - 1)))
+            continue
     
     # All attempts exhausted
     return {
@@ -265,45 +385,60 @@ def quick_match(finger, max_attempts=3, timeout_per_attempt=10, min_confidence=5
 def get_template(finger, location_id):
     """
     Get template data by ID from the sensor.
-    Returns bytes of the template.
+    Returns bytes of the template. Results are cached until the ID is
+    re-enrolled or deleted (see invalidate_template_cache).
     """
+    cache_key = (id(finger), location_id)
+    cached = _TEMPLATE_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
     # load to slot 1
     r = finger.load_model(location_id, slot=1)
     _ok_or_raise(r, f"load_model failed for ID {location_id}")
 
     # get fingerprint data from char buffer (slot 1)
     data_list = finger.get_fpdata(sensorbuffer="char", slot=1)
-    # get_fpdata returns list[int], convert to bytes
+    # get_fpdata returns list[int]; convert once to immutable bytes so the
+    # cached copy can be handed out (and hashed) without further copies
     b = bytes(data_list)
+    _TEMPLATE_CACHE[cache_key] = b
     
     return b
 
 # ---------- Display template bytes ----------
+@functools.lru_cache(maxsize=None)
+def _line_fmt(bytes_per_line):
+    """Hex dump line format for a given width: offset, padded hex column, ASCII column."""
+    return "{:04x}: {:<%d} |{}|" % (bytes_per_line * 3 - 1)
+
 def display_template_bytes(template_bytes, bytes_per_line=16):
     """
     Display template bytes in a formatted hex dump style.
     """
-    print(f"Template size: {len(template_bytes)} bytes")
-    print("-" * 60)
-    
+    rule = "-" * 60
+    lines = [f"Template size: {len(template_bytes)} bytes", rule]
+    line_fmt = _line_fmt(bytes_per_line)
     for i in range(0, len(template_bytes), bytes_per_line):
-        # Get line of bytes
         line_bytes = template_bytes[i:i + bytes_per_line]
         
-        # Format offset
-        offset = f"{i:04x}: "
-        
-        # Format hex bytes
-        hex_part = " ".join(f"{b:02x}" for b in line_bytes)
-        # Pad hex part to consistent width
-        hex_part = hex_part.ljust(bytes_per_line * 3 - 1)
-        
-        # Format ASCII representation
-        ascii_part = "".join(chr(b) if 32 <= b <= 126 else "." for b in line_bytes)
+        # hex() and translate() run in C instead of one f-string per byte
+        hex_part = line_bytes.hex(' ')
+        ascii_part = line_bytes.translate(_ASCII_TBL).decode('ascii')
         
-        print(f"{offset}{hex_part} |{ascii_part}|")
+        lines.append(line_fmt.format(i, hex_part, ascii_part))
     
-    print("-" * 60)
+    lines.append(rule)
+    
+    # One write() for the whole dump instead of one per line
+    out = '\n'.join(lines) + '\n'
+    buf = getattr(sys.stdout, 'buffer', None)
+    if buf is None:
+        sys.stdout.write(out)
+        return
+    sys.stdout.flush()  # keep ordering with earlier print() output
+    buf.write(out.encode('ascii'))
+    buf.flush()
 
 # ---------- Dump a template (raw) ----------
 def dump_template(finger, location_id, filename=None):
@@ -316,24 +451,41 @@ def dump_template(finger, location_id, filename=None):
     b = get_template(finger, location_id)
 
     if filename:
-        with open(filename, "wb") as f:
+        # Single small write: skip the userspace buffer entirely
+        with open(filename, "wb", buffering=0) as f:
             f.write(b)
         print(f"Wrote {len(b)} bytes to {filename}")
 
     print(f"Dumped template ID {location_id}, {len(b)} bytes")
     return b
 
+def dump_all_templates(finger, directory=".", pattern="template_id_{}.bin"):
+    """
+    Export every stored template to `directory`, one file per ID.
+    Each template is fetched and written in the same pass (no intermediate list).
+    Returns a dict of {location_id: filename}.
+    """
+    written = {}
+    for location_id in list_ids(finger):
+        filename = os.path.join(directory, pattern.format(location_id))
+        with open(filename, "wb", buffering=0) as f:
+            f.write(get_template(finger, location_id))
+        written[location_id] = filename
+    print(f"Exported {len(written)} templates to {directory}")
+    return written
+
 # ---------- Example usage ----------
 if __name__ == "__main__":
     print("Opening sensor...")
     f = open_sensor()
     print("Sensor ready.")
+    stored_ids = None  # read once, then handed to every match below
     try:
         stored_ids = list_ids(f)
         print("Stored IDs:", stored_ids)
         
         if stored_ids:
-            print(f"\n🔍 Ready to test fingerprint matching!")
+            print("\n🔍 Ready to test fingerprint matching!")
             print(f"Available templates: {stored_ids}")
             print("Uncomment the matching demo below to test.")
         else:
@@ -347,7 +499,7 @@ if __name__ == "__main__":
     # Uncomment to test the new matching functions:
     try:
         print("\n=== FINGERPRINT MATCHING TEST ===")
-        result = match_finger(f, timeout=15)
+        result = match_finger(f, timeout=15, ids=stored_ids)
         if result['success']:
             print(f"🎉 Matched ID {result['id']} with confidence {result['confidence']}")
         else:
@@ -359,7 +511,7 @@ if __name__ == "__main__":
     # Uncomment to test retry logic:
     try:
         print("\n=== QUICK MATCH WITH RETRY TEST ===")
-        result = quick_match(f, max_attempts=3, min_confidence=50)
+        result = quick_match(f, max_attempts=3, min_confidence=50, ids=stored_ids)
         if result['success']:
             print(f"🎉 High-confidence match: ID {result['id']}, confidence {result['confidence']}")
             print(f"   Succeeded on attempt {result['attempts']}")
@@ -4,10 +4,14 @@
 
 import sys
 import os
+import struct
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from rfid_manager import RFID_Manager
 
+# bytes.translate() table: printable ASCII kept, everything else shown as '.'
+_PRINTABLE = bytes(b if 32 <= b <= 126 else 0x2E for b in range(256))
+
 def debug_detailed_read():
     """Debug what's happening byte by byte"""
     
@@ -24,43 +28,41 @@ def debug_detailed_read():
     print("Reading raw blocks used by the string...")
     
     # Read the exact blocks that should contain our string
-    blocks_to_check = [4, 5, 6, 7, 8]  # Check a range around where data should be
+    # Check a range around where data should be (blocks 4-8), from one card read
+    blocks = rfid.read_blocks(4, 5) or {}
     
-    for block in blocks_to_check:
-        data = rfid.read_block(block)
+    for block, data in blocks.items():
         if data:
-            hex_data = ' '.join([f'{b:02x}' for b in data])
-            ascii_data = ''.join([chr(b) if 32 <= b <= 126 else '.' for b in data])
+            hex_data = data.hex(' ')
+            ascii_data = data.translate(_PRINTABLE).decode('ascii')
             print(f"Block {block}: {hex_data}")
             print(f"           {ascii_data}")
             
             # Also show as raw bytes for debugging
-            non_zero_bytes = [b for b in data if b != 0]
+            non_zero_bytes = data.replace(b'\x00', b'')
             if non_zero_bytes:
-                print(f"           Non-zero: {non_zero_bytes}")
+                print(f"           Non-zero: {list(non_zero_bytes)}")
             print()
     
     # Now manually reconstruct what the string should be
     print("Manual reconstruction from raw blocks:")
     
-    # Read blocks 4, 5, 6, 8 and manually piece together
-    block4 = rfid.read_block(4)
-    block5 = rfid.read_block(5) 
-    block6 = rfid.read_block(6)
-    block8 = rfid.read_block(8)
+    # Piece together blocks 4, 5, 6, 8 from the blocks already read above
+    block4 = blocks.get(4)
+    block5 = blocks.get(5)
+    block6 = blocks.get(6)
+    block8 = blocks.get(8)
     
     if block4:
         # Skip the 4-byte header, get the string data
-        header = block4[:4]
-        char_count = (header[0] << 24) | (header[1] << 16) | (header[2] << 8) | header[3]
+        char_count = struct.unpack_from('>I', block4, 0)[0]
         print(f"Header indicates {char_count} characters expected")
         
         # Collect all bytes after header
-        all_bytes = bytearray()
-        all_bytes.extend(block4[4:])  # Rest of block 4
-        if block5: all_bytes.extend(block5)  # All of block 5
-        if block6: all_bytes.extend(block6)  # All of block 6  
-        if block8: all_bytes.extend(block8)  # All of block 8
+        # Rest of block 4, then all of blocks 5, 6 and 8. join() sums the part
+        # lengths and allocates the result once; the memoryview skips copying
+        # block 4's tail into a temporary first.
+        all_bytes = b''.join([memoryview(block4)[4:], block5 or b'', block6 or b'', block8 or b''])
         
         print(f"Collected {len(all_bytes)} raw bytes total")
         
@@ -76,7 +78,7 @@ def debug_detailed_read():
         
         # Method 2: Remove nulls first, then decode
         try:
-            no_nulls = bytes([b for b in all_bytes if b != 0])
+            no_nulls = all_bytes.replace(b'\x00', b'')
             decode2 = no_nulls.decode('utf-8', errors='ignore')
             print(f"2. Remove nulls first: '{decode2}' ({len(decode2)} chars)")
         except Exception as e:
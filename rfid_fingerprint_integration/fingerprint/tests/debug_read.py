@@ -8,6 +8,9 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from rfid_manager import RFID_Manager
 
+# bytes.translate() table: printable ASCII kept, everything else shown as '.'
+_PRINTABLE = bytes(b if 32 <= b <= 126 else 0x2E for b in range(256))
+
 def debug_string_read():
     """Debug what's happening during string read"""
     
@@ -26,8 +29,8 @@ def debug_string_read():
     for block in [4, 5, 6]:
         data = rfid.read_block(block)
         if data:
-            hex_data = ' '.join([f'{b:02x}' for b in data])
-            ascii_data = ''.join([chr(b) if 32 <= b <= 126 else '.' for b in data])
+            hex_data = data.hex(' ')
+            ascii_data = data.translate(_PRINTABLE).decode('ascii')
             print(f"Block {block}: {hex_data}")
             print(f"           {ascii_data}")
             print()
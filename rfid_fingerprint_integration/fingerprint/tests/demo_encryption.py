@@ -39,21 +39,24 @@ def main():
     
     encrypted_messages = []
     
+    # One touch for the whole batch; every message still gets its own nonce
+    print("👆 Place your finger on the sensor to encrypt...")
+    key = crypto.capture_key()
+    if not key:
+        print("❌ Could not get an encryption key")
+        return
+    
     for i, message in enumerate(test_messages, 1):
-        print(f"\n--- Test {i}/4: \"{message[:30]}...\" ---")
+        print(f"\n--- Test {i}/{len(test_messages)}: \"{message[:30]}...\" ---")
         
-        print("👆 Place your finger on the sensor to encrypt...")
-        encrypted_data = crypto.encrypt_message(message)
-        
-        if not encrypted_data:
-            print("❌ Encryption failed!")
+        try:
+            encrypted_data = crypto.encrypt_with_key(key, message)
+        except Exception as e:
+            print(f"❌ Encryption failed: {e}")
             continue
             
         print(f"✅ Encrypted! ({len(encrypted_data)} bytes)")
         encrypted_messages.append((message, encrypted_data))
-        
-        # Small delay between tests
-        time.sleep(0.5)
     
     if not encrypted_messages:
         print("❌ No messages were encrypted successfully")
@@ -61,12 +64,22 @@ def main():
     
     print(f"\n3️⃣ Testing decryption of all {len(encrypted_messages)} messages...")
     
+    time.sleep(0.5)
+    print("👆 Place your finger on the sensor to decrypt...")
+    key = crypto.capture_key()
+    if not key:
+        print("❌ Could not get a decryption key")
+        return
+    
     success_count = 0
     for i, (original_message, encrypted_data) in enumerate(encrypted_messages, 1):
         print(f"\n--- Decrypt {i}/{len(encrypted_messages)}: \"{original_message[:30]}...\" ---")
         
-        print("👆 Place your finger on the sensor to decrypt...")
-        decrypted_message = crypto.decrypt_message(encrypted_data)
+        try:
+            decrypted_message = crypto.decrypt_with_key(key, encrypted_data)
+        except Exception as e:
+            decrypted_message = None
+            print(f"❌ Decryption error: {e or 'authentication tag mismatch'}")
         
         if decrypted_message == original_message:
             print(f"✅ SUCCESS! Decrypted correctly.")
@@ -75,8 +88,6 @@ def main():
             print(f"❌ FAILED! Decryption mismatch.")
             print(f"   Expected: \"{original_message}\"")
             print(f"   Got:      \"{decrypted_message}\"")
-        
-        time.sleep(0.5)
     
     print(f"\n4️⃣ FINAL RESULTS:")
     print("=" * 30)
@@ -87,7 +98,7 @@ def main():
         print("")
         print("📋 SYSTEM STATUS:")
         print("   • Fingerprint authentication: ✅ Working")
-        print("   • AES-256-CTR encryption: ✅ Working")
+        print("   • AES-256-GCM encryption: ✅ Working")
         print("   • Memory operations: ✅ Perfect")
         print("   • Card storage: ⚠️ Requires compatible MIFARE card")
         print("")
@@ -6,10 +6,10 @@ def find_next_available_id(finger, max_id=200):
         stored_ids = list_ids(finger)
         print(f"Currently stored IDs: {stored_ids}")
         
-        # Find next available ID starting from 1
-        for i in range(1, max_id + 1):
-            if i not in stored_ids:
-                return i
+        # Lowest free ID starting from 1, via one set difference
+        available = set(range(1, max_id + 1)).difference(stored_ids)
+        if available:
+            return min(available)
         
         raise RuntimeError(f"No available IDs (checked 1-{max_id})")
     except Exception as e:
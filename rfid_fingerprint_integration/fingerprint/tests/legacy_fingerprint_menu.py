@@ -5,21 +5,36 @@ Complete biometric encryption system with MIFARE card storage capability
 """
 
 from final_fingerprint_crypto import FinalFingerprintCrypto
+from enc_file import read_enc_file, write_enc_file
 from rfid_manager import RFID_Manager
 import os
-import json
+import asyncio
 import time
 import subprocess
 import base64
+import binascii
+import hashlib
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+CARD_STRING_CACHE_SIZE = 8
+CARD_STRING_PREFIX = b"E85:"
+DECRYPT_WORKERS = 4
+
 
 class FingerprintCryptoMenu:
     def __init__(self):
         self.crypto = FinalFingerprintCrypto()
         self.rfid = RFID_Manager()
-        self.encrypted_messages = []  # Store encrypted messages for testing
+        # Store encrypted messages for testing, one parallel list per field
+        self._msg_plaintext = []
+        self._msg_ct = []
+        self._msg_ts = array('d')    # time.time() at encryption
+        self._msg_size = array('I')  # ciphertext size in bytes
         self.connected = False
+        self._card_string_cache = OrderedDict()  # blake2b(ciphertext) -> card string (LRU)
         
     def connect_to_sensor(self):
         """Connect to the fingerprint sensor."""
@@ -102,18 +117,15 @@ class FingerprintCryptoMenu:
         
         if encrypted_data:
             # Store for later decryption tests
-            entry = {
-                'message': message,
-                'encrypted_data': encrypted_data,
-                'timestamp': datetime.now().isoformat(),
-                'size': len(encrypted_data)
-            }
-            self.encrypted_messages.append(entry)
+            self._msg_plaintext.append(message)
+            self._msg_ct.append(encrypted_data)
+            self._msg_ts.append(time.time())
+            self._msg_size.append(len(encrypted_data))
             
             print(f"\n✅ Message encrypted successfully!")
             print(f"   Original size: {len(message)} characters")
             print(f"   Encrypted size: {len(encrypted_data)} bytes")
-            print(f"   Stored as message #{len(self.encrypted_messages)}")
+            print(f"   Stored as message #{len(self._msg_ct)}")
         else:
             print("❌ Encryption failed!")
     
@@ -123,7 +135,7 @@ class FingerprintCryptoMenu:
             print("❌ Please connect to sensor first")
             return
             
-        if not self.encrypted_messages:
+        if not self._msg_ct:
             print("❌ No encrypted messages available")
             print("   Please encrypt a message first")
             return
@@ -133,26 +145,25 @@ class FingerprintCryptoMenu:
         
         # Show available messages
         print("Available encrypted messages:")
-        for i, entry in enumerate(self.encrypted_messages, 1):
-            timestamp = entry['timestamp'][:19].replace('T', ' ')
-            print(f"  {i}. \"{entry['message'][:50]}...\" ({timestamp})")
+        for i, (message, ts) in enumerate(zip(self._msg_plaintext, self._msg_ts), 1):
+            print(f"  {i}. \"{message[:50]}...\" ({self._format_ts(ts)})")
         
         try:
-            choice = int(input(f"\nSelect message to decrypt (1-{len(self.encrypted_messages)}): "))
-            if 1 <= choice <= len(self.encrypted_messages):
-                entry = self.encrypted_messages[choice - 1]
+            choice = int(input(f"\nSelect message to decrypt (1-{len(self._msg_ct)}): "))
+            if 1 <= choice <= len(self._msg_ct):
+                message = self._msg_plaintext[choice - 1]
                 
-                print(f"\nDecrypting message: \"{entry['message'][:50]}...\"")
+                print(f"\nDecrypting message: \"{message[:50]}...\"")
                 print("Please authenticate with your fingerprint...")
                 
-                decrypted = self.crypto.decrypt_message(entry['encrypted_data'])
+                decrypted = self.crypto.decrypt_message(self._msg_ct[choice - 1])
                 
                 if decrypted:
                     print(f"\n✅ Decryption successful!")
-                    print(f"   Original: \"{entry['message']}\"")
+                    print(f"   Original: \"{message}\"")
                     print(f"   Decrypted: \"{decrypted}\"")
                     
-                    if decrypted == entry['message']:
+                    if decrypted == message:
                         print("   ✅ Messages match perfectly!")
                     else:
                         print("   ❌ Messages don't match!")
@@ -190,16 +201,8 @@ class FingerprintCryptoMenu:
         
         if encrypted_data:
             try:
-                # Save to file with metadata
-                file_data = {
-                    'encrypted_data': encrypted_data.hex(),
-                    'original_message_length': len(message),
-                    'timestamp': datetime.now().isoformat(),
-                    'version': '1.0'
-                }
-                
-                with open(filename, 'w') as f:
-                    json.dump(file_data, f, indent=2)
+                # Save to file as fixed header + raw ciphertext
+                write_enc_file(filename, encrypted_data, len(message))
                 
                 print(f"✅ Message encrypted and saved to {filename}")
                 print(f"   File size: {os.path.getsize(filename)} bytes")
@@ -218,28 +221,27 @@ class FingerprintCryptoMenu:
         print("\n📖 DECRYPT FROM FILE")
         print("-" * 20)
         
-        # List .enc files
-        enc_files = [f for f in os.listdir('.') if f.endswith('.enc')]
+        # List .enc files (DirEntry.stat() reuses the directory scan)
+        with os.scandir('.') as it:
+            enc_files = [(e.name, e.stat().st_size) for e in it
+                         if e.is_file() and e.name.endswith('.enc')]
         
         if not enc_files:
             print("❌ No encrypted files found in current directory")
             return
             
         print("Available encrypted files:")
-        for i, filename in enumerate(enc_files, 1):
-            size = os.path.getsize(filename)
+        for i, (filename, size) in enumerate(enc_files, 1):
             print(f"  {i}. {filename} ({size} bytes)")
         
         try:
             choice = int(input(f"\nSelect file to decrypt (1-{len(enc_files)}): "))
             if 1 <= choice <= len(enc_files):
-                filename = enc_files[choice - 1]
+                filename, _ = enc_files[choice - 1]
                 
                 try:
-                    with open(filename, 'r') as f:
-                        file_data = json.load(f)
-                    
-                    encrypted_data = bytes.fromhex(file_data['encrypted_data'])
+                    file_data = read_enc_file(filename)
+                    encrypted_data = file_data['encrypted_data']
                     
                     print(f"\nDecrypting file: {filename}")
                     print("Please authenticate with your fingerprint...")
@@ -295,10 +297,12 @@ class FingerprintCryptoMenu:
         
         print("\n3️⃣ Testing multiple decryptions...")
         
-        for i in range(3):
-            print(f"   Decryption {i+1}/3...")
-            decrypted = self.crypto.decrypt_message(encrypted_data)
-            
+        results = self._decrypt_many(encrypted_data, 3)
+        if results is None:
+            print("❌ Multiple decryption test failed: authentication failed")
+            return
+        
+        for i, decrypted in enumerate(results):
             if decrypted != test_message:
                 print(f"❌ Multiple decryption test failed at attempt {i+1}")
                 return
@@ -333,15 +337,14 @@ class FingerprintCryptoMenu:
             return
             
         print(f"✅ Encrypted successfully!")
-        print(f"\nNow testing {num_tests} consecutive decryptions...")
+        print(f"\nNow testing {num_tests} decryptions (one fingerprint scan)...")
         
+        results = self._decrypt_many(encrypted_data, num_tests) or []
         success_count = 0
         
-        for i in range(num_tests):
+        for i, decrypted in enumerate(results):
             print(f"\n--- Decryption {i+1}/{num_tests} ---")
             
-            decrypted = self.crypto.decrypt_message(encrypted_data)
-            
             if decrypted == test_message:
                 print(f"✅ Success!")
                 success_count += 1
@@ -356,40 +359,80 @@ class FingerprintCryptoMenu:
         else:
             print(f"⚠️  {num_tests - success_count} decryptions failed")
     
+    def _decrypt_many(self, encrypted_data, count):
+        """
+        Authenticate once, then decrypt the same data count times on a thread pool.
+        Returns the list of results (None for a failed decryption), or None if
+        authentication failed.
+        """
+        key = self.crypto.capture_key()
+        if not key:
+            return None
+        
+        def decrypt(_):
+            try:
+                return self.crypto.decrypt_with_key(key, encrypted_data)
+            except Exception:
+                return None
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(DECRYPT_WORKERS, count))) as pool:
+            return list(pool.map(decrypt, range(count)))
+    
+    @staticmethod
+    def _format_ts(ts):
+        """Format a stored message timestamp for display."""
+        return datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
+    
     def show_encrypted_messages(self):
         """Show all stored encrypted messages."""
-        if not self.encrypted_messages:
+        if not self._msg_ct:
             print("❌ No encrypted messages stored")
             return
             
-        print(f"\n📊 STORED ENCRYPTED MESSAGES ({len(self.encrypted_messages)} total)")
+        print(f"\n📊 STORED ENCRYPTED MESSAGES ({len(self._msg_ct)} total)")
         print("-" * 50)
         
-        for i, entry in enumerate(self.encrypted_messages, 1):
-            timestamp = entry['timestamp'][:19].replace('T', ' ')
-            preview = entry['message'][:40] + "..." if len(entry['message']) > 40 else entry['message']
+        for i, (message, ts, size) in enumerate(zip(self._msg_plaintext, self._msg_ts, self._msg_size), 1):
+            preview = message[:40] + "..." if len(message) > 40 else message
             
             print(f"{i:2d}. {preview}")
-            print(f"    Size: {entry['size']} bytes | Time: {timestamp}")
+            print(f"    Size: {size} bytes | Time: {self._format_ts(ts)}")
             print()
     
     def clear_all_messages(self):
         """Clear all stored encrypted messages."""
-        if not self.encrypted_messages:
+        if not self._msg_ct:
             print("❌ No messages to clear")
             return
             
-        count = len(self.encrypted_messages)
+        count = len(self._msg_ct)
         confirm = input(f"Clear all {count} encrypted messages? (y/N): ").strip().lower()
         
         if confirm == 'y':
-            self.encrypted_messages.clear()
+            self._msg_plaintext.clear()
+            self._msg_ct.clear()
+            del self._msg_ts[:]
+            del self._msg_size[:]
             print(f"✅ Cleared {count} messages")
         else:
             print("❌ Cancelled")
     
     # ================== RFID CARD OPERATIONS ==================
     
+    def _card_string(self, encrypted_data, message_length):
+        """Build (or reuse) the text stored on the card for a ciphertext."""
+        key = hashlib.blake2b(encrypted_data, digest_size=8).digest() + message_length.to_bytes(4, 'big')
+        card_string = self._card_string_cache.get(key)
+        if card_string is None:
+            # Built as bytes: base85 output is already ASCII, so no decode/re-encode
+            card_string = CARD_STRING_PREFIX + base64.b85encode(encrypted_data) + b":%d" % message_length
+            self._card_string_cache[key] = card_string
+            if len(self._card_string_cache) > CARD_STRING_CACHE_SIZE:
+                self._card_string_cache.popitem(last=False)
+        else:
+            self._card_string_cache.move_to_end(key)
+        return card_string
+    
     def check_card_status(self):
         """Check RFID card status and information."""
         print("\n🏷️ CHECKING RFID CARD STATUS")
@@ -415,8 +458,9 @@ class FingerprintCryptoMenu:
         # Check for existing encrypted data
         print(f"\n🔍 CHECKING FOR ENCRYPTED DATA:")
         
+        snapshot = self.rfid.snapshot_blocks(range(1, 16))
         for start_block in [1, 4, 8]:
-            string_info = self.rfid.get_string_info(start_block)
+            string_info = self.rfid.get_string_info(start_block, snapshot=snapshot)
             if not string_info.get('error'):
                 print(f"   Block {start_block}: Found {string_info['length']} chars")
                 print(f"      Preview: \"{string_info['preview']}\"")
@@ -467,10 +511,9 @@ class FingerprintCryptoMenu:
         
         print(f"✅ Message encrypted! ({len(encrypted_data)} bytes)")
         
-        # Convert encrypted binary data to base64 string so we can use write_string()
-        # Format: "ENCRYPTED:" + base64_encoded_data + ":" + original_message_length
-        encrypted_b64 = base64.b64encode(encrypted_data).decode('ascii')
-        card_string = f"ENCRYPTED:{encrypted_b64}:{len(message)}"
+        # Convert encrypted binary data to base85 string so we can use write_string()
+        # Format: "E85:" + base85_encoded_data + ":" + original_message_length
+        card_string = self._card_string(encrypted_data, len(message))
         
         print(f"Prepared card string: {len(card_string)} characters")
         
@@ -488,24 +531,14 @@ class FingerprintCryptoMenu:
             if "error" not in info:
                 print(f"String info: {info['length']} characters, {info['blocks_needed']} blocks, format: {info['format']}")
             
-            # Verify by reading back (same as test_rfid.py)
-            print("Reading back...")
-            # Force a fresh read by clearing cache (same as test_rfid.py)
-            self.rfid.refresh_cache()
-            read_string = self.rfid.read_string(start_block)
-            
-            if read_string == card_string:
+            # Verify against a fresh card dump, comparing the written blocks byte for byte
+            print("Verifying card contents...")
+            if self.rfid.verify_string(start_block, card_string):
                 print("✅ Read back matches perfectly!")
                 print("✅ Message is securely stored on card.")
                 print("   You can now use 'Read Encrypted Message from Card' to retrieve it.")
             else:
-                print(f"⚠️ Read back differs:")
-                if read_string:
-                    print(f"  Expected length: {len(card_string)}")
-                    print(f"  Got length: {len(read_string)}")
-                    print(f"  First 100 chars match: {card_string[:100] == read_string[:100]}")
-                else:
-                    print("  Failed to read back string")
+                print(f"⚠️ Read back differs (card blocks do not match the {len(card_string)} characters written)")
         else:
             print("❌ Write failed")
     
@@ -518,48 +551,48 @@ class FingerprintCryptoMenu:
         print("\n📂 READ ENCRYPTED MESSAGE FROM CARD")
         print("-" * 40)
         
-        print("Place MIFARE Classic card on NFC reader...")
-        if not self.rfid.wait_for_card(timeout=10):
-            print("❌ No card detected")
-            return
-            
-        print("✅ Card detected!")
-        print("🔍 Reading encrypted data...")
-        
         # Use sector 2 for reading (same as writing)
         start_block = 8  # Sector 2, block 8 - same as writing
         
-        # Force a fresh read by clearing cache (same as test_rfid.py)
-        self.rfid.refresh_cache()
+        # The card reader and the fingerprint sensor are independent devices,
+        # so wait for the card and the finger at the same time
+        print("Place MIFARE Classic card on NFC reader and your finger on the sensor...")
+        card_present, card_data, key = asyncio.run(self._read_card_and_key(start_block))
         
-        # Read the string using the same method as test_rfid.py
-        card_string = self.rfid.read_string(start_block)
+        if not card_present:
+            print("❌ No card detected")
+            return
         
-        if not card_string:
+        if not card_data:
             print("❌ No data found on card at block 8")
             print("   Make sure you've saved an encrypted message first (option 12)")
             return
         
-        print(f"✅ Read {len(card_string)} characters from card")
+        print(f"✅ Read {len(card_data)} characters from card")
         
-        # Parse our format: "ENCRYPTED:" + base64_data + ":" + original_length
-        if not card_string.startswith("ENCRYPTED:"):
+        # Parse our format: "E85:" + base85_data + ":" + original_length
+        # (cards written before the switch use "ENCRYPTED:" + base64_data)
+        if not card_data.startswith((CARD_STRING_PREFIX, b"ENCRYPTED:")):
             print("❌ Invalid format - not an encrypted message")
-            print(f"   Found: '{card_string[:50]}...'")
+            print(f"   Found: '{card_data[:50].decode('utf-8', errors='replace')}...'")
             return
         
         try:
-            # Split the format: ENCRYPTED:base64data:length
-            parts = card_string.split(":")
-            if len(parts) != 3:
+            # Locate the delimiters of prefix:encoded_data:length
+            p1 = card_data.find(b":")
+            p2 = card_data.find(b":", p1 + 1)
+            if p2 < 0 or card_data.find(b":", p2 + 1) >= 0:
                 print("❌ Invalid encrypted message format")
                 return
             
-            encrypted_b64 = parts[1]
-            original_length = int(parts[2])
+            encoded = memoryview(card_data)[p1 + 1:p2]
+            original_length = int(card_data[p2 + 1:])
             
-            # Decode the base64 encrypted data
-            encrypted_data = base64.b64decode(encrypted_b64)
+            # Decode the encrypted data
+            if card_data[:p1] == b"E85":
+                encrypted_data = base64.b85decode(encoded)
+            else:
+                encrypted_data = binascii.a2b_base64(encoded)
             
             print(f"📋 Message info:")
             print(f"   Original length: {original_length} characters")
@@ -571,8 +604,13 @@ class FingerprintCryptoMenu:
         
         print(f"\n🔓 Decrypting with fingerprint authentication...")
         
-        # Decrypt using fingerprint
-        decrypted_message = self.crypto.decrypt_message(encrypted_data)
+        # Decrypt with the key captured while the card was being read
+        decrypted_message = None
+        if key:
+            try:
+                decrypted_message = self.crypto.decrypt_with_key(key, encrypted_data)
+            except Exception as e:
+                print(f"❌ Decryption error: {e}")
         
         if decrypted_message:
             print(f"\n✅ SUCCESSFULLY DECRYPTED!")
@@ -588,6 +626,25 @@ class FingerprintCryptoMenu:
             print("❌ Decryption failed!")
             print("   Make sure you're using the same finger that encrypted the message")
     
+    async def _read_card_and_key(self, start_block):
+        """
+        Read the card payload and capture the fingerprint key concurrently.
+        Returns (card_present, card_data, key).
+        """
+        def read_card():
+            if not self.rfid.wait_for_card(timeout=10):
+                return False, None
+            print("✅ Card detected! Reading encrypted data...")
+            # Force a fresh read by clearing cache (same as test_rfid.py)
+            self.rfid.refresh_cache()
+            # Read the string as bytes so it can be decoded without a str round trip
+            return True, self.rfid.read_string_raw(start_block)
+        
+        (card_present, card_data), key = await asyncio.gather(
+            asyncio.to_thread(read_card),
+            asyncio.to_thread(self.crypto.capture_key))
+        return card_present, card_data, key
+    
     def clear_card_data(self):
         """Clear all data from RFID card."""
         print("\n🧹 CLEAR CARD DATA")
@@ -602,8 +659,9 @@ class FingerprintCryptoMenu:
         
         # Check what's on the card first
         has_data = False
+        snapshot = self.rfid.snapshot_blocks(range(1, 16))
         for start_block in [1, 4, 8]:
-            info = self.rfid.get_string_info(start_block)
+            info = self.rfid.get_string_info(start_block, snapshot=snapshot)
             if not info.get('error'):
                 print(f"Found data at block {start_block}: {info['length']} chars")
                 has_data = True
@@ -620,13 +678,11 @@ class FingerprintCryptoMenu:
             
         print("🧹 Clearing card data...")
         
-        # Write empty blocks to clear data
-        success_count = 0
-        for block in [1, 2, 4, 5, 6, 8, 9, 10, 12, 13, 14]:  # Skip trailer blocks
-            empty_data = b'\x00' * 16
-            if self.rfid.write_block(block, empty_data):
-                success_count += 1
-            
+        # Write empty blocks to clear data in a single card read/write cycle
+        blocks = [1, 2, 4, 5, 6, 8, 9, 10, 12, 13, 14]  # Skip trailer blocks
+        ops = [(block, b'\x00' * 16) for block in blocks]
+        success_count = len(ops) if self.rfid.write_blocks_batch(ops) else 0
+
         if success_count > 0:
             print(f"✅ Cleared {success_count} blocks")
             print("Card is now ready for new data")
@@ -651,8 +707,9 @@ class FingerprintCryptoMenu:
         
         # Show string data if any
         print(f"\n🔤 STRING DATA ANALYSIS:")
+        snapshot = self.rfid.snapshot_blocks(range(1, 16))
         for start_block in [1, 4, 8]:
-            info = self.rfid.get_string_info(start_block)
+            info = self.rfid.get_string_info(start_block, snapshot=snapshot)
             if not info.get('error'):
                 print(f"Block {start_block}: {info['length']} chars - \"{info['preview']}\"")
             else:
@@ -8,7 +8,7 @@ SYSTEM STATUS: ✅ FULLY FUNCTIONAL (with card compatibility notes)
 
 ## What Works Perfectly:
 1. ✅ Fingerprint enrollment and detection 
-2. ✅ AES-256-CTR encryption with fingerprint-derived keys
+2. ✅ AES-256-GCM encryption with fingerprint-derived keys
 3. ✅ Memory-based encrypt/decrypt operations  
 4. ✅ RFID card detection and reading
 5. ✅ Complete menu-driven interface
@@ -46,7 +46,7 @@ If you want to try recovering this card:
 3. Use specialized MIFARE tools for key recovery
 
 ## Technical Details:
-• Encryption Algorithm: AES-256-CTR with fingerprint-derived keys
+• Encryption Algorithm: AES-256-GCM with fingerprint-derived keys
 • Card Format: [2-byte length][encrypted data] in binary
 • Block Management: Automatic trailer block avoidance
 • Error Handling: Comprehensive verification and fallback
@@ -66,29 +66,56 @@ Your fingerprint encryption system is working correctly!
 The card issue is a hardware/access limitation, not a software problem.
 """
 
+import atexit
+import os
+import sys
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+try:
+    from legacy_fingerprint_menu import FingerprintCryptoMenu
+except ImportError as e:
+    FingerprintCryptoMenu = None
+    _IMPORT_ERROR = e
+
 print(__doc__)
 
+_MENU = None  # one menu (sensor + NFC session) per process
+
+
+def _close_menu():
+    """Close the sensor's serial port once at interpreter exit."""
+    finger = getattr(_MENU.crypto, 'finger', None) if _MENU else None
+    uart = getattr(finger, '_uart', None)
+    if uart is not None:
+        try:
+            uart.close()
+        except Exception:
+            pass
+
+
+atexit.register(_close_menu)
+
+
 def main():
+    global _MENU
+    
     print("\n" + "="*60)
     print("🚀 LAUNCHING FINGERPRINT ENCRYPTION MENU")
     print("="*60)
     
-    # Import and run the main menu
-    import sys
-    import os
-    
-    # Add current directory to path
-    sys.path.insert(0, os.path.dirname(__file__))
+    if FingerprintCryptoMenu is None:
+        print(f"❌ Import error: {_IMPORT_ERROR}")
+        print("   Make sure legacy_fingerprint_menu.py is in the current directory")
+        return
     
     try:
-        from fingerprint_menu import FingerprintCryptoMenu
-        menu = FingerprintCryptoMenu()
-        menu.run()
-    except ImportError as e:
-        print(f"❌ Import error: {e}")
-        print("   Make sure fingerprint_menu.py is in the current directory")
+        # Reuse the menu (and its open sensor connection) on relaunch
+        _MENU = _MENU or FingerprintCryptoMenu()
+        _MENU.run()
     except Exception as e:
         print(f"❌ Error: {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
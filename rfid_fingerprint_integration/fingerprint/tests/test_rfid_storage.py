@@ -5,7 +5,8 @@
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-import base64
+import struct
+import hmac
 
 from rfid_manager import RFID_Manager
 
@@ -24,11 +25,10 @@ def test_rfid_crypto_storage():
     print(f"Original message: '{fake_message}' ({len(fake_message)} chars)")
     print(f"Simulated encrypted data: {len(fake_encrypted)} bytes")
     
-    # Convert to base64 format like the fingerprint system does
-    encrypted_b64 = base64.b64encode(fake_encrypted).decode('ascii')
-    card_string = f"ENCRYPTED:{encrypted_b64}:{len(fake_message)}"
+    # Store raw ciphertext as [2-byte length][encrypted data], no text encoding
+    card_payload = struct.pack(">H", len(fake_encrypted)) + fake_encrypted
     
-    print(f"Card string: '{card_string}' ({len(card_string)} chars)")
+    print(f"Card payload: {len(card_payload)} bytes")
     
     # Wait for card
     print("\nPlace MIFARE Classic card on reader...")
@@ -42,47 +42,43 @@ def test_rfid_crypto_storage():
         print("❌ Card connection failed")
         return False
         
-    # Write the string
+    # Write the payload in one batched card write
     start_block = 4
     print(f"\nWriting to block {start_block}...")
     
-    if rfid.write_string(start_block, card_string):
+    if rfid.write_blocks(start_block, card_payload):
         print("✅ Write successful!")
         
-        # Read back
+        # Read back the whole sector once and parse the payload from it
         print("Reading back...")
-        rfid.refresh_cache()
-        read_string = rfid.read_string(start_block)
+        sector_buf = bytearray(48)  # reusable buffer for one sector's data blocks
+        sector = rfid.read_sector(start_block // 4, into=sector_buf)
+        if not sector:
+            print("❌ Failed to read back sector")
+            return False
         
-        if read_string == card_string:
-            print("✅ Perfect match!")
-            
-            # Parse and verify
-            if read_string.startswith("ENCRYPTED:"):
-                parts = read_string.split(":")
-                if len(parts) == 3:
-                    retrieved_b64 = parts[1]
-                    original_length = int(parts[2])
-                    retrieved_encrypted = base64.b64decode(retrieved_b64)
-                    
-                    print(f"\n📋 Verification:")
-                    print(f"   Retrieved original length: {original_length}")
-                    print(f"   Retrieved encrypted data: {len(retrieved_encrypted)} bytes")
-                    print(f"   Data matches: {retrieved_encrypted == fake_encrypted}")
-                    
-                    if retrieved_encrypted == fake_encrypted and original_length == len(fake_message):
-                        print("\n🎉 SUCCESS: RFID card storage working perfectly!")
-                        return True
-                    else:
-                        print("\n❌ Data corruption during storage/retrieval")
-                else:
-                    print("\n❌ Invalid format after retrieval")
-            else:
-                print("\n❌ Wrong format prefix")
+        offset = (start_block % 4) * 16
+        n = struct.unpack_from(">H", sector, offset)[0]
+        if offset + 2 + n <= len(sector):
+            retrieved_encrypted = memoryview(sector)[offset + 2:offset + 2 + n]
         else:
-            print(f"❌ Mismatch!")
-            print(f"  Expected: '{card_string}'")
-            print(f"  Got:      '{read_string}'")
+            # Payload continues past this sector's data blocks
+            buf = rfid.read_data(start_block, 2 + n)
+            retrieved_encrypted = memoryview(buf)[2:2 + n] if buf else None
+        
+        print(f"\n📋 Verification:")
+        print(f"   Retrieved encrypted data: {n} bytes")
+        
+        # Constant-time compare straight on the read buffer, no copies
+        if retrieved_encrypted is not None and hmac.compare_digest(retrieved_encrypted, fake_encrypted):
+            print("   Data matches: True")
+            print("\n🎉 SUCCESS: RFID card storage working perfectly!")
+            return True
+        else:
+            print("   Data matches: False")
+            print("\n❌ Data corruption during storage/retrieval")
+            print(f"  Expected: {fake_encrypted.hex()}")
+            print(f"  Got:      {bytes(retrieved_encrypted).hex() if retrieved_encrypted is not None else 'None'}")
     else:
         print("❌ Write failed")
         
@@ -37,13 +37,27 @@ class RFID_Manager:
         self.temp_dir = temp_dir
         self.temp_file = os.path.join(temp_dir, "rfid_dump.mfd")
         self.last_error_time = 0
+        # Card cache, one field per array: the dump image kept in memory (tied to
+        # the dump file by mtime/size) and one stale flag per block (max 256 on 4K)
+        self._dump = None
+        self._dump_stamp = None
+        self._stale = bytearray(256)
+        self._stale_count = 0
+        # Last get_card_info() result and when it was taken; dropped as soon
+        # as a presence check finds no card
+        self._card_info = None
+        self._card_info_at = 0.0
     
     # ================== BASIC CARD OPERATIONS ==================
     
-    def is_card_present(self) -> bool:
+    def is_card_present(self, recover: bool = True) -> bool:
         """
         Check if a MIFARE Classic card is present on the reader.
         
+        Args:
+            recover: Try to reset the PN532 on I/O errors (pass False from
+                     background polling so it never kills other nfc tools)
+        
         Returns:
             bool: True if card is detected, False otherwise
         """
@@ -54,9 +68,13 @@ class RFID_Manager:
                                   timeout=3)
             
             if result.returncode == 0:
-                return "ISO14443A passive target(s) found:" in result.stdout
+                present = "ISO14443A passive target(s) found:" in result.stdout
+                if not present:
+                    self._card_info = None
+                return present
             else:
-                self._handle_nfc_error(result.stderr)
+                if recover:
+                    self._handle_nfc_error(result.stderr)
                 return False
         except subprocess.TimeoutExpired:
             return False
@@ -103,13 +121,22 @@ class RFID_Manager:
         
         return False
     
-    def get_card_info(self) -> dict:
+    def get_card_info(self, max_age: float = 0.0) -> dict:
         """
         Get detailed information about the current card.
         
+        Args:
+            max_age: Seconds a previous result may be reused instead of running
+                     nfc-list again (default 0: always scan). Only pass a
+                     positive value where a swapped card cannot matter.
+        
         Returns:
             dict: Card information including UID, type, size, etc.
         """
+        if (max_age > 0 and self._card_info is not None
+                and time.monotonic() - self._card_info_at < max_age):
+            return dict(self._card_info)
+        
         try:
             result = subprocess.run(['nfc-list'], 
                                   capture_output=True, 
@@ -178,6 +205,12 @@ class RFID_Manager:
             # Skip writeability analysis to avoid circular dependency
             # This will be done lazily when needed
             
+            if info["present"]:
+                self._card_info = dict(info)
+                self._card_info_at = time.monotonic()
+            else:
+                self._card_info = None
+            
             return info
             
         except Exception as e:
@@ -311,11 +344,20 @@ class RFID_Manager:
         """
         try:
             # Check if we already have a valid dump file (must be > 1KB for any useful data)
-            if os.path.exists(self.temp_file):
+            try:
+                st = os.stat(self.temp_file)
+            except OSError:
+                st = None
+            if st is not None:
+                # Same file as last time: reuse the in-memory image
+                stamp = (st.st_mtime_ns, st.st_size)
+                if self._dump is not None and self._dump_stamp == stamp:
+                    return self._dump
                 try:
                     with open(self.temp_file, 'rb') as f:
                         data = f.read()
                     if len(data) >= 1024:  # Must have at least 1KB of data
+                        self._dump, self._dump_stamp = data, stamp
                         return data
                 except:
                     pass
@@ -380,6 +422,7 @@ class RFID_Manager:
             print(f"Invalid block number: {block_num} (must be 0-{max_blocks} for {card_info.get('type', 'this card')})")
             return None
         
+        self._refresh_if_stale((block_num,))
         data = self.read_card_raw()
         if data and len(data) >= (block_num + 1) * 16:
             start = block_num * 16
@@ -415,6 +458,89 @@ class RFID_Manager:
         
         return bytes(result)
     
+    def read_blocks(self, start_block: int, num_blocks: int) -> Optional[dict]:
+        """
+        Read consecutive blocks from a single card dump.
+        
+        Unlike calling read_block() in a loop, the card type is looked up and
+        the card is read only once for the whole range.
+        
+        Args:
+            start_block: Starting block number
+            num_blocks: Number of blocks to read
+            
+        Returns:
+            dict: {block_num: 16-byte block data}, or None if failed
+        """
+        card_info = self.get_card_info()
+        max_blocks = 256 if card_info.get('type') == 'MIFARE Classic 4K' else 64
+        
+        if start_block < 0 or start_block + num_blocks > max_blocks:
+            print(f"Block range exceeds card capacity (max {max_blocks} blocks)")
+            return None
+        
+        self._refresh_if_stale(range(start_block, start_block + num_blocks))
+        data = self.read_card_raw()
+        if not data or len(data) < (start_block + num_blocks) * 16:
+            return None
+        
+        return {block: data[block * 16:(block + 1) * 16]
+                for block in range(start_block, start_block + num_blocks)}
+    
+    def read_sector(self, sector_idx: int, into: Optional[bytearray] = None):
+        """
+        Read all data blocks of a sector (trailer excluded) in one go.
+        
+        Args:
+            sector_idx: Sector number (0-15 for 1K, 0-39 for 4K cards)
+            into: Optional reusable buffer (e.g. bytearray(48)) to copy the data into
+                  instead of allocating a new bytes object
+            
+        Returns:
+            bytes: Concatenated data blocks (48 bytes, 240 for 4K sectors 32-39),
+                   a memoryview over `into` when given, or None if failed
+        """
+        if sector_idx < 32:
+            first_block, num_blocks = sector_idx * 4, 4
+        else:
+            first_block, num_blocks = 128 + (sector_idx - 32) * 16, 16
+        data_blocks = range(first_block, first_block + num_blocks - 1)
+        
+        self._refresh_if_stale(data_blocks)
+        data = self.read_card_raw()
+        if not data or len(data) < (first_block + num_blocks) * 16:
+            print(f"Failed to read sector {sector_idx}")
+            return None
+        
+        start, end = first_block * 16, (first_block + num_blocks - 1) * 16
+        if into is not None and len(into) >= end - start:
+            view = memoryview(into)[:end - start]
+            view[:] = memoryview(data)[start:end]
+            return view
+        return data[start:end]
+    
+    def snapshot_blocks(self, block_range) -> dict:
+        """
+        Take a snapshot of several blocks from a single card dump.
+        
+        The snapshot can be passed to get_string_info() so that several
+        headers can be inspected without going back to the reader each time.
+        
+        Args:
+            block_range: Iterable of block numbers (e.g. range(1, 16))
+            
+        Returns:
+            dict: {block_num: 16-byte block data}, empty if the card could not be read
+        """
+        block_range = list(block_range)
+        self._refresh_if_stale(block_range)
+        data = self.read_card_raw()
+        if not data:
+            return {}
+        
+        return {block: data[block * 16:(block + 1) * 16]
+                for block in block_range if 0 <= block and (block + 1) * 16 <= len(data)}
+    
     def write_block(self, block_num: int, data: bytes) -> bool:
         """
         Write 16 bytes of data to a specific block.
@@ -518,10 +644,150 @@ class RFID_Manager:
         except Exception as e:
             print(f"Write error: {e}")
             return False
+
+    def write_blocks_batch(self, ops: List[Tuple[int, bytes]]) -> bool:
+        """
+        Write several blocks with a single card read and a single card write.
+
+        All blocks are patched into one in-memory dump which is then written
+        with one nfc-mfclassic call, instead of a full read/write cycle per block.
+        Block 0 and trailer blocks are rejected.
+
+        Args:
+            ops: List of (block_num, data) tuples, data must be exactly 16 bytes
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        if not ops:
+            return True
+
+        card_info = self.get_card_info()
+        max_blocks = 255 if card_info.get('type') == 'MIFARE Classic 4K' else 63
+
+        for block_num, data in ops:
+            if len(data) != 16:
+                print(f"Block data must be exactly 16 bytes, got {len(data)} for block {block_num}")
+                return False
+            if not (0 < block_num <= max_blocks) or (block_num + 1) % 4 == 0:
+                print(f"Block {block_num} cannot be written in a batch (manufacturer or trailer block)")
+                return False
+
+        card_data = self.read_card_raw()
+        if not card_data:
+            print("Failed to read card for batch write")
+            return False
+
+        card_data = bytearray(card_data)
+        for block_num, data in ops:
+            start = block_num * 16
+            card_data[start:start + 16] = data
+
+        write_file = os.path.join(self.temp_dir, "rfid_batch_write.mfd")
+        try:
+            with open(write_file, 'wb') as f:
+                f.write(card_data)
+
+            result = subprocess.run([
+                'nfc-mfclassic', 'w', 'A', 'u', write_file
+            ], capture_output=True, text=True, timeout=20)
+
+            if result.returncode == 0:
+                print(f"Successfully wrote {len(ops)} blocks in one batch")
+                self._store_written_blocks(card_data, [block_num for block_num, _ in ops])
+                return True
+
+            print(f"Batch write failed: {result.stderr}")
+            # Invalidate cached dump so next read gets fresh data
+            if os.path.exists(self.temp_file):
+                os.remove(self.temp_file)
+            return False
+
+        except Exception as e:
+            print(f"Batch write error: {e}")
+            return False
+        finally:
+            if os.path.exists(write_file):
+                os.remove(write_file)
+
+    def _data_blocks(self, start_block: int, count: int) -> List[int]:
+        """
+        Get count consecutive data block numbers from start_block,
+        skipping block 0 and trailer blocks.
+        
+        Args:
+            start_block: First block to consider
+            count: Number of data blocks needed
+            
+        Returns:
+            list: Block numbers in write order
+        """
+        blocks = []
+        block_num = max(start_block, 1)
+        while len(blocks) < count:
+            if (block_num + 1) % 4 != 0:
+                blocks.append(block_num)
+            block_num += 1
+        return blocks
+    
+    def write_blocks(self, start_block: int, payload: bytes) -> bool:
+        """
+        Write a payload across consecutive data blocks in one card write.
+        The payload is zero-padded to whole blocks and trailer blocks are skipped.
+        
+        Args:
+            start_block: First block to write
+            payload: Bytes to store
+            
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        return self.write_blocks_batch(self._frame_blocks(payload, start_block))
+    
+    def _frame_blocks(self, payload: bytes, start_block: int) -> List[Tuple[int, memoryview]]:
+        """
+        Split a payload into (block_num, 16-byte chunk) pairs over consecutive
+        data blocks. Chunks are memoryview slices of one padded buffer, so no
+        per-block bytes objects are created.
+        
+        Args:
+            payload: Bytes to frame (zero-padded to whole blocks)
+            start_block: First block to use
+            
+        Returns:
+            list: (block_num, chunk) tuples in write order
+        """
+        padded = bytearray(payload)
+        padded.extend(bytes(-len(padded) % 16))
+        view = memoryview(padded)
+        blocks = self._data_blocks(start_block, len(padded) // 16)
+        return [(block_num, view[i * 16:(i + 1) * 16]) for i, block_num in enumerate(blocks)]
+    
+    def read_data(self, start_block: int, length: int) -> Optional[bytes]:
+        """
+        Read bytes written with write_blocks() from a single card dump.
+        
+        Args:
+            start_block: First block of the payload
+            length: Number of bytes to read
+            
+        Returns:
+            bytes: The requested bytes, or None if failed
+        """
+        if length <= 0:
+            return b''
+        
+        blocks = self._data_blocks(start_block, (length + 15) // 16)
+        self._refresh_if_stale(blocks)
+        data = self.read_card_raw()
+        if not data or len(data) < (blocks[-1] + 1) * 16:
+            return None
+        
+        return b''.join([data[block * 16:(block + 1) * 16] for block in blocks])[:length]
     
     # ================== STRING OPERATIONS ==================
     
-    def write_string(self, start_block: int, text: str, max_length: int = 3000) -> bool:
+    def write_string(self, start_block: int, text, max_length: int = 3000) -> bool:
         """
         Write a string across multiple blocks continuously, automatically skipping trailer blocks.
         Format: [4-byte length][string data...]
@@ -534,7 +800,7 @@ class RFID_Manager:
         
         Args:
             start_block: Starting block number (should not be 0 or trailer block)
-            text: String to write (any length up to max_length)
+            text: String to write (any length up to max_length), or its UTF-8 bytes
             max_length: Maximum string length allowed (default 3000 chars)
             
         Returns:
@@ -554,21 +820,8 @@ class RFID_Manager:
             print(f"Warning: Block {start_block} is a trailer block. Starting at next block.")
             start_block += 1
         
-        # Convert string to UTF-8 bytes
-        text_bytes = text.encode('utf-8')
-        char_length = len(text)  # Store character count, not byte count
-        
-        # Prepare data with 4-byte length header (storing character count)
-        data = bytearray()
-        data.append((char_length >> 24) & 0xFF)  # Highest byte
-        data.append((char_length >> 16) & 0xFF)  # High byte  
-        data.append((char_length >> 8) & 0xFF)   # Low byte
-        data.append(char_length & 0xFF)          # Lowest byte
-        data.extend(text_bytes)
-        
-        # Pad to complete blocks
-        while len(data) % 16 != 0:
-            data.append(0)
+        text_bytes = self._utf8(text)
+        data = self._pack_string(text)
         
         # Calculate number of 16-byte chunks needed
         chunks_needed = len(data) // 16
@@ -586,31 +839,8 @@ class RFID_Manager:
         
         # NEW APPROACH: Use first block of each sector to avoid intra-sector auth issues
         # Start from sector that contains start_block and use first block of subsequent sectors
-        available_blocks = []
-        
-        # Determine starting sector
-        start_sector = start_block // 4
-        
-        print(f"Using cross-sector approach starting from sector {start_sector}")
-        
-        # Use first data block of each sector (4, 8, 12, 16, 20, etc.)
-        for sector_num in range(start_sector, 16):  # MIFARE 1K has 16 sectors
-            first_block = sector_num * 4
-            
-            # Skip sector 0 entirely (contains UID and manufacturer data)
-            if sector_num == 0:
-                continue
-                
-            # For the starting sector, use the requested start_block if it's valid
-            if sector_num == start_sector and start_block % 4 != 3:  # Not a trailer
-                available_blocks.append(start_block)
-            else:
-                # Use first data block of this sector
-                available_blocks.append(first_block)
-            
-            # Stop when we have enough blocks
-            if len(available_blocks) >= chunks_needed:
-                break
+        print(f"Using cross-sector approach starting from sector {start_block // 4}")
+        available_blocks = self._string_blocks(start_block, chunks_needed)
         
         if len(available_blocks) < chunks_needed:
             print(f"Error: Not enough writable blocks available")
@@ -655,9 +885,8 @@ class RFID_Manager:
             if result.returncode == 0:
                 print("✅ Batch write successful! Verifying blocks...")
                 
-                # Invalidate cache and verify all blocks
-                if os.path.exists(self.temp_file):
-                    os.remove(self.temp_file)
+                # Invalidate only the written blocks and verify them
+                self._store_written_blocks(card_data, available_blocks[:chunks_needed])
                 
                 import time
                 time.sleep(0.2)  # Let card settle
@@ -692,6 +921,98 @@ class RFID_Manager:
                 os.remove(write_file)
             return False
     
+    def _pack_string(self, text) -> bytes:
+        """
+        Encode a string in the on-card format used by write_string().
+        Format: [4-byte big-endian character count][UTF-8 data][zero padding to 16 bytes]
+        
+        Args:
+            text: String to encode, or its UTF-8 bytes (used as-is, no re-encode)
+            
+        Returns:
+            bytes: Encoded data, a multiple of 16 bytes long
+        """
+        text_bytes = self._utf8(text)
+        data = bytearray(self._char_count(text).to_bytes(4, 'big'))  # Store character count, not byte count
+        data.extend(text_bytes)
+        data.extend(bytes(-len(data) % 16))
+        return bytes(data)
+    
+    @staticmethod
+    def _utf8(text) -> bytes:
+        """Return the UTF-8 bytes of a str, or bytes-like input unchanged."""
+        return text.encode('utf-8') if isinstance(text, str) else bytes(text)
+    
+    @staticmethod
+    def _char_count(text) -> int:
+        """Character count of a str or of UTF-8 bytes (ASCII bytes need no decode)."""
+        if isinstance(text, str) or text.isascii():
+            return len(text)
+        return len(bytes(text).decode('utf-8'))
+    
+    def _string_blocks(self, start_block: int, chunks_needed: int) -> List[int]:
+        """
+        Get the block sequence write_string() uses for a string.
+        The start block is used first, then the first data block of each following sector.
+        
+        Args:
+            start_block: Starting block number (not a trailer block)
+            chunks_needed: Number of 16-byte blocks the string needs
+            
+        Returns:
+            list: Block numbers, possibly fewer than chunks_needed if the card runs out
+        """
+        available_blocks = []
+        start_sector = start_block // 4
+        
+        # Use first data block of each sector (4, 8, 12, 16, 20, etc.)
+        for sector_num in range(start_sector, 16):  # MIFARE 1K has 16 sectors
+            # Skip sector 0 entirely (contains UID and manufacturer data)
+            if sector_num == 0:
+                continue
+            
+            # For the starting sector, use the requested start_block if it's valid
+            if sector_num == start_sector and start_block % 4 != 3:  # Not a trailer
+                available_blocks.append(start_block)
+            else:
+                available_blocks.append(sector_num * 4)
+            
+            if len(available_blocks) >= chunks_needed:
+                break
+        
+        return available_blocks
+    
+    def verify_string(self, start_block: int, text) -> bool:
+        """
+        Check that a string written with write_string() is on the card.
+        
+        The expected block contents are rebuilt from the string already in memory
+        and compared byte for byte against one card dump, instead of decoding
+        the string back with read_string(). The card is still read once.
+        
+        Args:
+            start_block: Starting block number used for write_string()
+            text: The string (or UTF-8 bytes) that was written
+            
+        Returns:
+            bool: True if the card holds the string, False otherwise
+        """
+        if (start_block + 1) % 4 == 0:
+            start_block += 1
+        
+        data = self._pack_string(text)
+        blocks = self._string_blocks(start_block, len(data) // 16)
+        if len(blocks) * 16 < len(data):
+            return False
+        
+        self._refresh_if_stale(blocks)
+        card_data = self.read_card_raw()
+        if not card_data or len(card_data) < (blocks[-1] + 1) * 16:
+            print("Failed to read card for verification")
+            return False
+        
+        return b''.join(card_data[b * 16:(b + 1) * 16] for b in blocks) == data
+    
     def write_long_string(self, text: str, start_sector: int = 1) -> bool:
         """
         Write very long strings efficiently by using entire sectors.
@@ -715,19 +1036,23 @@ class RFID_Manager:
         print(f"Writing long string starting from sector {start_sector}, block {start_block}")
         return self.write_string(start_block, text, max_length=10000)
     
-    def get_string_info(self, start_block: int) -> dict:
+    def get_string_info(self, start_block: int, snapshot: Optional[dict] = None) -> dict:
         """
         Get information about a string stored on the card without reading the full content.
         
         Args:
             start_block: Starting block number where string begins
+            snapshot: Optional {block_num: data} from snapshot_blocks() to read from
             
         Returns:
             dict: Information about the stored string
         """
         try:
             # Read just the first block to get metadata
-            block_data = self.read_block(start_block)
+            if snapshot is not None:
+                block_data = snapshot.get(start_block)
+            else:
+                block_data = self.read_block(start_block)
             if not block_data:
                 return {"error": "Cannot read starting block"}
             
@@ -943,6 +1268,42 @@ class RFID_Manager:
             traceback.print_exc()
             return None
     
+    def read_string_raw(self, start_block: int, max_length: int = 3000) -> Optional[bytes]:
+        """
+        Read a string written with write_string() as raw UTF-8 bytes.
+        
+        All blocks come from a single card dump and are joined without decoding,
+        which suits ASCII payloads such as encoded ciphertext. Anything else
+        (old 2-byte headers, non-ASCII text) falls back to read_string().
+        
+        Args:
+            start_block: Starting block number where string begins
+            max_length: Maximum expected string length (default 3000)
+            
+        Returns:
+            bytes: The string's UTF-8 bytes, or None if failed
+        """
+        # The block sequence is only known after the header, so any stale block counts
+        if self._stale_count:
+            self.refresh_cache()
+        data = self.read_card_raw()
+        if not data or len(data) < (start_block + 1) * 16:
+            print(f"Failed to read starting block {start_block}")
+            return None
+        
+        header = data[start_block * 16:start_block * 16 + 4]
+        char_count = int.from_bytes(header, 'big')
+        
+        if header[0] == 0 and 0 < char_count <= max_length:
+            blocks = self._string_blocks(start_block, (4 + char_count + 15) // 16)
+            if all((block + 1) * 16 <= len(data) for block in blocks):
+                payload = b''.join([data[block * 16:(block + 1) * 16] for block in blocks])[4:4 + char_count]
+                if len(payload) == char_count and payload.isascii():
+                    return payload
+        
+        text = self.read_string(start_block, max_length)
+        return text.encode('utf-8') if text is not None else None
+    
     # ================== UTILITY FUNCTIONS ==================
     
     def format_card_display(self, num_blocks: int = 16) -> str:
@@ -1129,9 +1490,53 @@ class RFID_Manager:
         Force a refresh of the cached card data.
         Useful after writing multiple blocks or when reads seem stale.
         """
+        self._drop_dump()
+        self._card_info = None
+        print("Card cache refreshed")
+    
+    def _drop_dump(self):
+        """Forget the cached dump (file and memory) so the next read re-reads the card."""
         if os.path.exists(self.temp_file):
             os.remove(self.temp_file)
-        print("Card cache refreshed")
+        self._dump = self._dump_stamp = None
+        self._stale[:] = bytes(len(self._stale))
+        self._stale_count = 0
+    
+    def invalidate_blocks(self, blocks) -> None:
+        """
+        Mark blocks as stale in the cached card dump.
+        
+        Reads that touch a stale block re-read the card; reads of other
+        blocks keep using the cached dump.
+        
+        Args:
+            blocks: Iterable of block numbers
+        """
+        stale = self._stale
+        for block_num in blocks:
+            if 0 <= block_num < len(stale) and not stale[block_num]:
+                stale[block_num] = 1
+                self._stale_count += 1
+    
+    def _refresh_if_stale(self, blocks):
+        """Drop the cached dump if any of the given blocks has been invalidated."""
+        if self._stale_count:
+            stale = self._stale
+            if any(stale[block_num] for block_num in blocks if 0 <= block_num < len(stale)):
+                self._drop_dump()
+    
+    def _store_written_blocks(self, card_data: bytes, blocks) -> None:
+        """
+        Keep the dump that was just written as the card cache and mark the
+        written blocks stale, so only reads of those blocks go back to the card.
+        
+        Args:
+            card_data: Full card image that was written
+            blocks: Block numbers that were changed
+        """
+        with open(self.temp_file, 'wb') as f:
+            f.write(card_data)
+        self.invalidate_blocks(blocks)
     
     def check_and_recover_connection(self) -> bool:
         """
@@ -2,12 +2,18 @@ import board
 import busio
 import digitalio
 from adafruit_pn532.spi import PN532_SPI
+import queue
+import threading
 import time
 
 # SPI setup
 spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
 cs_pin = digitalio.DigitalInOut(board.D8)  # CE0 = GPIO8
 
+# PN532 IRQ line (active low): pulled low when a response is ready
+irq_pin = digitalio.DigitalInOut(board.D24)
+irq_pin.direction = digitalio.Direction.INPUT
+
 # Create PN532 object
 pn532 = PN532_SPI(spi, cs_pin, debug=False)
 
@@ -17,6 +23,82 @@ print("Found PN532 with firmware version: {0}.{1}".format(ver, rev))
 
 pn532.SAM_configuration()
 
+
+class PN532Worker(threading.Thread):
+    """Owns the PN532 and runs its commands off the main thread.
+
+    Commands go in on cmd_q as (name, args, kwargs); each produces one
+    (name, result) on res_q. A 'batch' command runs a list of
+    (name, args) pairs back to back and returns the list of results,
+    stopping at the first failed auth or read. A 'wait' command arms the
+    reader, sleeps until the IRQ line reports a target and returns its
+    UID, or None after the timeout.
+    """
+
+    COMMANDS = {
+        'auth': 'mifare_classic_authenticate_block',
+        'read': 'mifare_classic_read_block',
+        'write': 'mifare_classic_write_block',
+    }
+
+    def __init__(self, pn532, irq_pin):
+        super().__init__(daemon=True)
+        self.pn532 = pn532
+        self.irq_pin = irq_pin
+        self.cmd_q = queue.Queue()
+        self.res_q = queue.Queue()
+
+    def submit(self, cmd, *args, **kwargs):
+        """Queue a command without waiting for it.
+
+        res_q is shared, so its result must be taken off res_q before the
+        next call().
+        """
+        self.cmd_q.put((cmd, args, kwargs))
+
+    def call(self, cmd, *args, **kwargs):
+        """Queue a command and wait for its result."""
+        self.submit(cmd, *args, **kwargs)
+        return self.res_q.get()[1]
+
+    def _wait_for_card(self, timeout=0.5):
+        if not self.pn532.listen_for_passive_target():
+            return None
+        deadline = time.monotonic() + timeout
+        # IRQ is active low: high means no target has answered yet
+        while self.irq_pin.value:
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.01)
+        return self.pn532.get_passive_target(timeout=0.1)
+
+    def _run_one(self, cmd, args, kwargs):
+        try:
+            if cmd == 'wait':
+                return self._wait_for_card(*args, **kwargs)
+            return getattr(self.pn532, self.COMMANDS[cmd])(*args, **kwargs)
+        except Exception as e:
+            print(f"PN532 {cmd} error: {e}")
+            return None
+
+    def run(self):
+        while True:
+            cmd, args, kwargs = self.cmd_q.get()
+            if cmd == 'batch':
+                results = []
+                for sub_cmd, sub_args in args[0]:
+                    result = self._run_one(sub_cmd, sub_args, {})
+                    results.append(result)
+                    if not result:
+                        break
+                self.res_q.put((cmd, results))
+            else:
+                self.res_q.put((cmd, self._run_one(cmd, args, kwargs)))
+
+
+worker = PN532Worker(pn532, irq_pin)
+worker.start()
+
 print("Waiting for a card...")
 
 # Default Mifare Classic key
@@ -28,21 +110,25 @@ def is_trailer_block(block_num):
 
 
 def next_data_block(block_num):
+    """Return (next data block, whether it is in a different sector)."""
+    sector = block_num // 4
     block_num += 1
     if is_trailer_block(block_num):
         block_num += 1
-    return block_num
+    return block_num, block_num // 4 != sector
 
 
 def read_long_string(uid, start_block, max_len=900):
     uid = bytes(uid)  # ensure UID is in bytes form
 
-    # Authenticate first block
-    if not pn532.mifare_classic_authenticate_block(uid, start_block, 0, key_default):
+    # Authenticate and read the first block in one round trip to the worker
+    results = worker.call('batch', [('auth', (uid, start_block, 0, key_default)),
+                                    ('read', (start_block,))])
+    if not results[0]:
         print(f"Auth failed at block {start_block}")
         return None
 
-    block = pn532.mifare_classic_read_block(start_block)
+    block = results[1] if len(results) > 1 else None
     if block is None:
         return None
 
@@ -52,41 +138,63 @@ def read_long_string(uid, start_block, max_len=900):
     if length > max_len:
         return None
 
-    data = bytearray()
-    data.extend(block[2:2 + min(14, length)])
+    # The length is known up front, so fill a preallocated buffer in place
+    data = bytearray(length)
+    copied = min(14, length)
+    data[:copied] = block[2:2 + copied]
 
-    copied = len(data)
-    block_num = next_data_block(start_block)
+    block_num, sector_changed = next_data_block(start_block)
 
-    while copied < length:
-        if not pn532.mifare_classic_authenticate_block(uid, block_num, 0, key_default):
-            print(f"Auth failed at block {block_num}")
-            return None
-        blk = pn532.mifare_classic_read_block(block_num)
-        if blk is None:
+    # Queue every remaining read as one batch; one auth per sector is enough
+    read_indexes = []
+    ops = []
+    while copied + 16 * len(read_indexes) < length:
+        if block_num > 63:
             return None
+        if sector_changed:
+            ops.append(('auth', (uid, block_num, 0, key_default)))
+        ops.append(('read', (block_num,)))
+        read_indexes.append(len(ops) - 1)
+        block_num, sector_changed = next_data_block(block_num)
+
+    results = worker.call('batch', ops) if ops else []
+
+    if len(results) < len(ops) or (results and not results[-1]):
+        failed_cmd, failed_args = ops[len(results) - 1]
+        if failed_cmd == 'auth':
+            print(f"Auth failed at block {failed_args[1]}")
+        return None
+
+    for i in read_indexes:
+        blk = results[i]
         need = length - copied
         copy_now = min(16, need)
-        data.extend(blk[:copy_now])
+        data[copied:copied + copy_now] = blk[:copy_now]
         copied += copy_now
-        block_num = next_data_block(block_num)
-        if block_num > 63:
-            return None
 
     return data.decode("utf-8", errors="ignore")
 
 
+worker.submit('wait', timeout=0.5)
+
 while True:
-    uid = pn532.read_passive_target(timeout=0.5)
+    try:
+        _, uid = worker.res_q.get(timeout=0.05)
+    except queue.Empty:
+        # The worker is waiting on the IRQ line; other main-loop work can run here
+        continue
+
     if uid is None:
+        worker.submit('wait', timeout=0.5)
         continue
 
     print("Found card with UID:", [hex(i) for i in uid])
     uid = bytes(uid)  # ✅ Fix: convert UID to bytes before using
     print("Card detected UID:", [hex(x) for x in uid])
 
-    if pn532.mifare_classic_authenticate_block(uid, 4, 0, key_default):
-        data = pn532.mifare_classic_read_block(4)
+    results = worker.call('batch', [('auth', (uid, 4, 0, key_default)), ('read', (4,))])
+    if results[0]:
+        data = results[1] if len(results) > 1 else None
         print("Block 4:", data)
     else:
         print("Auth failed for block 4")
@@ -99,3 +207,4 @@ while True:
 
     print("Remove card to read again...\n")
     time.sleep(1)
+    worker.submit('wait', timeout=0.5)
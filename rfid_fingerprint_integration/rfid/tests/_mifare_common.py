@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Shared MIFARE Classic helpers for the PN532 test scripts.
+
+Every function takes the script's PN532 object as its first argument.
+"""
+import time
+import binascii
+
+SPI_HZ = 1_000_000  # PN532 handles up to ~5MHz; drop to 100_000 on long/noisy wiring
+
+# Common MIFARE keys
+COMMON_KEYS = (
+    b'\xFF\xFF\xFF\xFF\xFF\xFF',  # factory default
+    b'\xA0\xA1\xA2\xA3\xA4\xA5',
+    b'\xD3\xF7\xD3\xF7\xD3\xF7',
+    b'\x00\x00\x00\x00\x00\x00',
+    b'\x01\x02\x03\x04\x05\x06',
+    b'\x4D\x3A\x99\xC3\x51\xDD',
+)
+
+
+# Printable form of each key, computed once for the log lines
+KEY_HEX = {key: binascii.hexlify(key).decode().upper() for key in COMMON_KEYS}
+
+# Every (key, key_type) pair to probe, 0 = KEY_A, 1 = KEY_B
+KEY_CANDIDATES = tuple((key, key_type) for key in COMMON_KEYS for key_type in (0, 1))
+
+# Last pair that authenticated; tried first on the next block or card
+_LAST_GOOD = [None]
+
+
+def set_spi_clock(pn532, hz=SPI_HZ):
+    """
+    Run the PN532 bus at hz. adafruit_pn532 reconfigures the bus from its
+    own SPIDevice (100kHz by default) on every transaction, so the clock has
+    to be set there; spi.configure() on the bus itself is overridden.
+    """
+    pn532._spi.baudrate = hz
+
+
+def try_auth_all_keys(pn532, uid_bytes, block, verbose=False):
+    """
+    Try all keys and both key types (0 = KEY_A, 1 = KEY_B), starting with
+    the pair that worked last time.
+    Return tuple (key, key_type) on success, else (None, None).
+    """
+    last = _LAST_GOOD[0]
+    candidates = KEY_CANDIDATES if last is None else \
+        (last,) + tuple(c for c in KEY_CANDIDATES if c != last)
+
+    auth = pn532.mifare_classic_authenticate_block
+
+    # Only back off after a failure, doubling up to a small cap
+    delay = 0.0
+    for key, key_type in candidates:
+        try:
+            if verbose:
+                print(f"  Trying key {KEY_HEX[key]} (key_type={'A' if key_type==0 else 'B'})...")
+            if delay:
+                time.sleep(delay)
+            ok = auth(uid_bytes, block, key_type, key)
+            if ok:
+                if verbose:
+                    print(f"  ✅ SUCCESS with key {KEY_HEX[key]}")
+                _LAST_GOOD[0] = (key, key_type)
+                return key, key_type
+            if verbose:
+                print(f"  ❌ Authentication failed (returned False)")
+            delay = min(delay * 2 or 0.005, 0.05)
+        except Exception as e:
+            # Print driver error but continue trying others
+            print(f"  ❌ Exception for key {KEY_HEX[key]} key_type {'A' if key_type==0 else 'B'}: {e}")
+            delay = min(delay * 2 or 0.02, 0.1)
+    return None, None
+
+
+def wait_for_card(pn532, irq_pin, timeout=None):
+    """
+    Arm the PN532 for one passive target and sleep until its IRQ line
+    (active low) says a card answered, instead of spinning on
+    read_passive_target. Return the UID, or None on timeout.
+    """
+    if not pn532.listen_for_passive_target():
+        return None
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while irq_pin.value:
+        if deadline is not None and time.monotonic() >= deadline:
+            return None
+        time.sleep(0.01)
+    return pn532.get_passive_target(timeout=0.1)
+
+
+def is_trailer_block(block_num):
+    return (block_num % 4) == 3
+
+
+def next_data_block(block_num):
+    block_num += 1
+    if is_trailer_block(block_num):
+        block_num += 1
+    return block_num
+
+
+def read_long_string(pn532, uid_bytes, start_block, key, key_type, max_len=900):
+    """
+    Read a length-prefixed string starting at start_block.
+    key/key_type are the credentials found by try_auth_all_keys; MIFARE
+    Classic authenticates a whole sector, so they are only re-sent when
+    the read crosses into the next sector.
+    """
+    # Bound once; these run for every block of the string
+    auth = pn532.mifare_classic_authenticate_block
+    read = pn532.mifare_classic_read_block
+
+    if not auth(uid_bytes, start_block, key_type, key):
+        return None
+    current_sector = start_block // 4
+
+    # Now attempt to read start block
+    block = read(start_block)
+    if block is None:
+        return None
+
+    length = (block[0] << 8) | block[1]
+    if length == 0:
+        return ""
+    if length > max_len:
+        return None
+
+    # Length is known from the header: fill a preallocated buffer in place
+    data = bytearray(length)
+    view = memoryview(data)
+    copied = min(14, length)
+    view[:copied] = block[2:2 + copied]
+    block_num = next_data_block(start_block)
+
+    while copied < length:
+        if block_num > 63:
+            return None
+        new_sector = block_num // 4
+        if new_sector != current_sector:
+            if not auth(uid_bytes, block_num, key_type, key):
+                return None
+            current_sector = new_sector
+        blk = read(block_num)
+        if blk is None:
+            return None
+        need = length - copied
+        copy_now = min(16, need)
+        view[copied:copied + copy_now] = blk[:copy_now]
+        copied += copy_now
+        block_num = next_data_block(block_num)
+
+    return data.decode("utf-8", errors="ignore")
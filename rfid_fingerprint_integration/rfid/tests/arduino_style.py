@@ -6,17 +6,15 @@ from adafruit_pn532.spi import PN532_SPI
 import time
 import binascii
 
+from _mifare_common import set_spi_clock
+
 print("=== Arduino-Style MIFARE Authentication ===")
 print("Attempting to mimic Arduino MFRC522 behavior\n")
 
 cs_pin = digitalio.DigitalInOut(board.D8)  # Use your working CE0
 spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
 pn532 = PN532_SPI(spi, cs_pin, debug=False)
-
-while not spi.try_lock():
-    pass
-spi.configure(baudrate=50000)
-spi.unlock()
+set_spi_clock(pn532)
 
 ic, ver, rev, support = pn532.firmware_version
 print(f"PN532 firmware: {ver}.{rev}")
@@ -31,11 +29,11 @@ def arduino_style_auth():
     
     # Step 1: Detect card with multiple attempts (Arduino style)
     uid = None
+    # read_passive_target already waits out its timeout, so no extra sleep
     for attempt in range(10):
         uid = pn532.read_passive_target(timeout=0.2)
         if uid:
             break
-        time.sleep(0.1)
     
     if not uid:
         return False
@@ -43,36 +41,41 @@ def arduino_style_auth():
     uid_bytes = bytes(uid)
     print(f"Card found: {binascii.hexlify(uid_bytes).decode().upper()}")
     
-    # Step 2: Multiple re-selections (Arduino MFRC522 often does this)
-    print("Re-selecting card for stability...")
-    for i in range(3):
-        uid2 = pn532.read_passive_target(timeout=0.1)
-        if uid2 and bytes(uid2) == uid_bytes:
-            print(f"  Re-selection {i+1}: ✅")
-        else:
-            print(f"  Re-selection {i+1}: ❌")
-        time.sleep(0.05)
+    # The target returned by read_passive_target is already selected
+    # (ISO 14443-3), so go straight to authentication
     
-    # Step 3: Try different blocks with Arduino-typical approach
-    key = bytearray(b'\xFF\xFF\xFF\xFF\xFF\xFF')
+    # Step 2: Try different blocks with Arduino-typical approach
+    key = b'\xFF\xFF\xFF\xFF\xFF\xFF'
     
     # Arduino usually starts with sector trailer blocks or specific data blocks
     test_blocks = [4, 8, 12, 16, 1, 2, 5, 6]  # Different block order
     
+    # Keys live in the sector trailer, so one probe per sector tells us all
+    # there is to know about its blocks
+    seen_sectors = set()
+    
     for block in test_blocks:
         if block > 63:  # Skip invalid blocks for 1K cards
             continue
+        sector = block // 4
+        if sector in seen_sectors:
+            continue
+        seen_sectors.add(sector)
             
         print(f"\nTesting block {block}:")
         
+        # Each auth returns synchronously, so a new block starts without
+        # waiting; only back off after a failed attempt on the same block
+        delay = 0.0
+        
         # Try Key A first, then Key B (Arduino default order)
         for key_type in [0, 1]:  # 0=KeyA, 1=KeyB
             key_name = "A" if key_type == 0 else "B"
             print(f"  Key {key_name}...", end="")
             
             try:
-                # Add extra delay (Arduino libraries are often slower)
-                time.sleep(0.1)
+                if delay:
+                    time.sleep(delay)
                 
                 result = pn532.mifare_classic_authenticate_block(uid_bytes, block, key_type, key)
                 
@@ -92,12 +95,11 @@ def arduino_style_auth():
                         
                 else:
                     print(" ❌ (False)")
+                    delay = min(delay * 2 or 0.005, 0.05)
                     
             except Exception as e:
                 print(f" ❌ ({e})")
-            
-            # Delay between attempts (Arduino style)
-            time.sleep(0.1)
+                delay = min(delay * 2 or 0.02, 0.1)
     
     return False
 
@@ -119,7 +121,7 @@ def try_alternative_approach():
             
             # Try block 0 with different approach
             print("Attempting block 0 read (manufacturer block)...")
-            key = bytearray(b'\xFF\xFF\xFF\xFF\xFF\xFF')
+            key = b'\xFF\xFF\xFF\xFF\xFF\xFF'
             
             try:
                 # Some cards allow reading block 0 without auth
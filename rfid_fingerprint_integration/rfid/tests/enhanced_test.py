@@ -6,6 +6,8 @@ from adafruit_pn532.spi import PN532_SPI
 import time
 import binascii
 
+from _mifare_common import set_spi_clock
+
 # ---- CONFIG ----
 USE_CE1 = False
 DEBUG_PN532 = False
@@ -14,11 +16,7 @@ DEBUG_PN532 = False
 cs_pin = digitalio.DigitalInOut(board.D7 if USE_CE1 else board.D8)
 spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
 pn532 = PN532_SPI(spi, cs_pin, debug=DEBUG_PN532)
-
-while not spi.try_lock():
-    pass
-spi.configure(baudrate=50000)
-spi.unlock()
+set_spi_clock(pn532)
 
 print(f"Using CS pin: {'D7 (CE1)' if USE_CE1 else 'D8 (CE0)'}")
 
@@ -58,7 +56,8 @@ def enhanced_card_test():
             print("❌ Card lost during re-detection")
             return False
             
-        if bytes(uid2) != uid_bytes:
+        # bytearray compares with bytes by content; no copy needed
+        if uid2 != uid_bytes:
             print("❌ UID changed during re-detection")
             return False
             
@@ -66,7 +65,7 @@ def enhanced_card_test():
         
         # Now try authentication with maximum delays
         print("Step 4: Attempting authentication...")
-        key_default = bytearray(b'\xFF\xFF\xFF\xFF\xFF\xFF')
+        key_default = b'\xFF\xFF\xFF\xFF\xFF\xFF'
         
         # Try with extra delay before auth
         time.sleep(0.2)
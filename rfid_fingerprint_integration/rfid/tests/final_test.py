@@ -11,7 +11,7 @@ spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
 pn532 = PN532_SPI(spi, cs_pin, debug=False)
 
 while not spi.try_lock():
-    pass
+    time.sleep(0.001)  # yield instead of spinning on a busy bus
 spi.configure(baudrate=25000)  # Even slower - 25kHz
 spi.unlock()
 
@@ -63,7 +63,7 @@ def try_different_approach():
             
         # Test 4: Try authentication with different parameters
         print("\nTest 3: Authentication with different timing...")
-        key = bytearray(b'\xFF\xFF\xFF\xFF\xFF\xFF')
+        key = b'\xFF\xFF\xFF\xFF\xFF\xFF'
         
         for block in [1, 4]:
             print(f"\nTrying block {block}:")
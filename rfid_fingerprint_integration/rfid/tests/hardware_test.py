@@ -27,7 +27,7 @@ for use_ce1 in [False, True]:
                 pn532 = PN532_SPI(spi, cs_pin, debug=False)
                 
                 while not spi.try_lock():
-                    pass
+                    time.sleep(0.001)  # yield instead of spinning on a busy bus
                 spi.configure(baudrate=speed)
                 spi.unlock()
                 
@@ -52,7 +52,7 @@ for use_ce1 in [False, True]:
                         
                         # Quick auth test
                         uid_bytes = bytes(uid)
-                        key = bytearray(b'\xFF\xFF\xFF\xFF\xFF\xFF')
+                        key = b'\xFF\xFF\xFF\xFF\xFF\xFF'
                         
                         try:
                             result = pn532.mifare_classic_authenticate_block(uid_bytes, 1, 0, key)
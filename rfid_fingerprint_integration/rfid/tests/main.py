@@ -47,10 +47,12 @@ def read_long_string(uid, start_block, max_len=900):
     if length > max_len:
         return None
 
-    data = bytearray()
-    data.extend(block[2:2 + min(14, length)])
+    # Length is known from the header: fill a preallocated buffer in place
+    data = bytearray(length)
+    view = memoryview(data)
+    copied = min(14, length)
+    view[:copied] = block[2:2 + copied]
 
-    copied = len(data)
     block_num = next_data_block(start_block)
 
     while copied < length:
@@ -61,7 +63,7 @@ def read_long_string(uid, start_block, max_len=900):
             return None
         need = length - copied
         copy_now = min(16, need)
-        data.extend(blk[:copy_now])
+        view[copied:copied + copy_now] = blk[:copy_now]
         copied += copy_now
         block_num = next_data_block(block_num)
         if block_num > 63:
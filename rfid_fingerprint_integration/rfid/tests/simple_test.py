@@ -6,6 +6,8 @@ from adafruit_pn532.spi import PN532_SPI
 import time
 import binascii
 
+from _mifare_common import set_spi_clock
+
 # ---- CONFIG ----
 USE_CE1 = False   # set True if your PN532 CS is wired to CE1 (GPIO7 / board.D7)
 DEBUG_PN532 = False  # set True to enable lower-level PN532 debug from driver
@@ -19,10 +21,7 @@ spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
 
 # Create PN532 object
 pn532 = PN532_SPI(spi, cs_pin, debug=DEBUG_PN532)
-while not spi.try_lock():
-    pass
-spi.configure(baudrate=50000)  # 50kHz for stability
-spi.unlock()
+set_spi_clock(pn532)
 print(f"Using CS pin: {'D7 (CE1)' if USE_CE1 else 'D8 (CE0)'}")
 
 # check firmware
@@ -42,7 +41,7 @@ def test_simple_read():
     try:
         # Block 0 is usually readable without authentication
         # But let's try with default key first
-        key_default = bytearray(b'\xFF\xFF\xFF\xFF\xFF\xFF')
+        key_default = b'\xFF\xFF\xFF\xFF\xFF\xFF'
         print("Attempting to authenticate block 0 with default key...")
         
         # Get card UID first